@@ -1,3 +1,4 @@
+import os
 from datetime import datetime,timezone
 from flask_login import UserMixin
 from flask import Flask
@@ -5,12 +6,15 @@ from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
+from sqlalchemy.orm import validates
+from texte import normaliser
 ##########
 
 
 
 app= Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///recommandation.db'
+# DATABASE_URL permet de pointer vers une autre base (ex : sqlite:////tmp/bench.db pour les benchmarks)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///recommandation.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 app.config['MAIL_SERVER'] = 'smtp.gmail.com'
@@ -96,6 +100,7 @@ class Cours(db.Model):
     
     id_cours = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nom = db.Column(db.Text, nullable=False)
+    nom_normalise = db.Column(db.Text, index=True)  # nom sans accents ni majuscules, tenu à jour par valider_nom
     type_ressource = db.Column(db.Text, nullable=False)
     domaine = db.Column(db.Text, nullable=False)
     langue = db.Column(db.Text, nullable=False)
@@ -115,6 +120,13 @@ class Cours(db.Model):
     favoris = db.relationship("Favoris", back_populates="cours", cascade="all, delete")
     avis = db.relationship("Avis", back_populates="cours", cascade="all, delete")
     historique = db.relationship("Historique_Consultation", back_populates="cours", cascade="all, delete")
+    stats = db.relationship("Cours_Stats", back_populates="cours", cascade="all, delete", uselist=False)
+    affinites = db.relationship("Affinites", back_populates="cours", cascade="all, delete")
+
+    @validates("nom")
+    def valider_nom(self, cle, nom):
+        self.nom_normalise = normaliser(nom)
+        return nom
 
     def __repr__(self):
         return f"<Cours {self.domaine} - {self.niveau} ({self.chemin_source})>"
@@ -175,3 +187,72 @@ class Avis(db.Model):
     cours = db.relationship("Cours", back_populates="avis", passive_deletes=True)
 
 ##################
+
+class Cours_Stats(db.Model):
+    __tablename__ = "Cours_Stats"
+
+    # Agrégats tenus à jour à chaque écriture (voir stats_cours.py), pour éviter les jointures
+    # Cours × Avis × Favoris × Historique_Consultation qui multiplient les lignes avant regroupement
+    cours_id = db.Column(db.Integer, db.ForeignKey("Cours.id_cours", ondelete="CASCADE"), primary_key=True)
+    somme_notes = db.Column(db.Integer, nullable=False, default=0)
+    nombre_avis = db.Column(db.Integer, nullable=False, default=0)
+    moyenne = db.Column(db.Float, nullable=False, default=0)
+    nombre_favoris = db.Column(db.Integer, nullable=False, default=0)
+    nombre_consultations = db.Column(db.Integer, nullable=False, default=0)
+    derniere_activite = db.Column(db.Text, default=db.func.current_timestamp())
+
+    cours = db.relationship("Cours", back_populates="stats", passive_deletes=True)
+
+##################
+
+class Affinites(db.Model):
+    __tablename__ = "Affinites"
+
+    # Score d'intérêt d'un utilisateur pour un cours, à décroissance exponentielle (voir affinites.py).
+    # Le score est stocké à l'échelle de la date de référence : chaque signal y ajoute poids × e^(λ·(t − t0)).
+    user_id = db.Column(db.Text, db.ForeignKey("Utilisateurs.id_user", ondelete="CASCADE"), primary_key=True)
+    cours_id = db.Column(db.Integer, db.ForeignKey("Cours.id_cours", ondelete="CASCADE"), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0)
+    date_maj = db.Column(db.Text, default=db.func.current_timestamp())
+
+    cours = db.relationship("Cours", back_populates="affinites", passive_deletes=True)
+
+##################
+
+class Versions(db.Model):
+    __tablename__ = "Versions"
+
+    # Compteurs croissants (catalogue, activité, cours, utilisateur) servant aux ETag (voir versions.py)
+    cle = db.Column(db.Text, primary_key=True)
+    valeur = db.Column(db.Integer, nullable=False, default=0)
+
+##################
+
+class Recommandations(db.Model):
+    __tablename__ = "Recommandations"
+
+    id_recommandation = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Text, db.ForeignKey("Utilisateurs.id_user", ondelete="CASCADE"), nullable=False, index=True)
+    cours_id = db.Column(db.Integer, db.ForeignKey("Cours.id_cours", ondelete="CASCADE"), nullable=False)
+    stratégie = db.Column(db.Text, nullable=False)
+    rang = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float)
+    moyenne_note = db.Column(db.Float)
+    date_calcul = db.Column(db.Text, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.CheckConstraint("stratégie IN ('populaire', 'hybride')", name="check_strategie"),
+    )
+
+##################
+
+class Recommandations_Etat(db.Model):
+    __tablename__ = "Recommandations_Etat"
+
+    # Empreinte des interactions et du profil de l'utilisateur lors du dernier calcul de chaque stratégie
+    user_id = db.Column(db.Text, db.ForeignKey("Utilisateurs.id_user", ondelete="CASCADE"), primary_key=True)
+    stratégie = db.Column(db.Text, primary_key=True)
+    signature = db.Column(db.Text, nullable=False)
+    date_calcul = db.Column(db.Text, default=db.func.current_timestamp())
+
+##################
@@ -0,0 +1,151 @@
+"""Recalcule la table Affinites (intérêt de chaque utilisateur pour chaque cours) à partir des interactions.
+
+Les scores sont ensuite tenus à jour à chaque consultation, favori ou avis ; ce recalcul complet
+n'est nécessaire qu'au premier déploiement ou après un changement de RECO_AFFINITE_DEMI_VIE.
+
+Exemple : python affinites.py
+"""
+import argparse
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func, insert, update
+
+from Models import app, db, Affinites, Avis, Favoris, Historique_Consultation
+from versions import lire_versions, fixer_version
+
+# Demi-vie (en jours) de l'intérêt porté à un cours : un signal vaut moitié moins au bout de ce délai
+app.config.setdefault('RECO_AFFINITE_DEMI_VIE', 30)
+
+# Poids de chaque signal ; pour les avis, le poids est multiplié par la note
+POIDS_AFFINITE = {"consultation": 1.0, "favori": 4.0, "avis": 1.0}
+
+# Date de référence t0 des scores stockés. Un signal de poids w reçu à la date t ajoute
+# w × e^(λ·(t − t0)) au score : la mise à jour est une simple addition, sans relire l'ancienne
+# valeur ni sa date, et le score courant s'obtient en multipliant par e^(−λ·(maintenant − t0)).
+# t0 est ORIGINE décalée du nombre de jours stocké dans la table Versions (clé CLE_REFERENCE) ;
+# quand λ·(t − t0) dépasse EXPOSANT_MAX, t0 est avancée et tous les scores multipliés par
+# e^(−λ·Δ) dans la même transaction (e^x dépasse les flottants vers x = 709).
+ORIGINE = datetime(2025, 1, 1)
+CLE_REFERENCE = "affinites_reference"
+EXPOSANT_MAX = 100.0
+
+
+def _taux():
+    return math.log(2) / app.config['RECO_AFFINITE_DEMI_VIE']
+
+
+def _jours(instant, reference):
+    return (instant - reference).total_seconds() / 86400
+
+
+def reference():
+    """Date de référence courante des scores stockés (lue dans la transaction en cours)."""
+    return ORIGINE + timedelta(days=lire_versions(CLE_REFERENCE)[0])
+
+
+def avancer_reference(instant=None):
+    """Ramène t0 au jour de instant (par défaut : maintenant) et les scores stockés avec elle, dans la transaction en cours."""
+    ancienne = reference()
+    decalage = (lire_date(instant) - ORIGINE).days
+    nouvelle = ORIGINE + timedelta(days=decalage)
+    if nouvelle <= ancienne:
+        return ancienne
+    facteur = math.exp(-_taux() * _jours(nouvelle, ancienne))
+    db.session.execute(update(Affinites).values(score=Affinites.score * facteur).execution_options(synchronize_session=False))
+    fixer_version(CLE_REFERENCE, decalage)
+    return nouvelle
+
+
+def _reference_pour(instant):
+    # Référence avec laquelle un signal de cette date reste représentable
+    actuelle = reference()
+    if _taux() * _jours(instant, actuelle) > EXPOSANT_MAX:
+        return avancer_reference(instant)
+    return actuelle
+
+
+def maintenant():
+    # Même convention que CURRENT_TIMESTAMP dans SQLite : UTC, sans fuseau
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def lire_date(texte):
+    """Date d'une ligne (texte 'AAAA-MM-JJ HH:MM:SS' ou date) ; maintenant si elle est absente."""
+    if not texte:
+        return maintenant()
+    if isinstance(texte, datetime):
+        return texte
+    return datetime.fromisoformat(str(texte))
+
+
+def ajouter_affinite(user_id, cours_id, poids, instant=None):
+    """Ajoute un signal daté (par défaut : maintenant) au score, dans la transaction en cours (commit à la charge de l'appelant).
+
+    Un poids négatif retire un signal passé : il faut alors fournir sa date d'origine.
+    """
+    instant = instant or maintenant()
+    valeur = poids * math.exp(_taux() * _jours(instant, _reference_pour(instant)))
+    resultat = db.session.execute(
+        update(Affinites).where(Affinites.user_id == user_id, Affinites.cours_id == cours_id).values(
+            score=Affinites.score + valeur,
+            date_maj=func.current_timestamp(),
+        ).execution_options(synchronize_session=False)
+    )
+    if resultat.rowcount == 0:
+        db.session.execute(insert(Affinites).values(user_id=user_id, cours_id=cours_id, score=max(valeur, 0.0)))
+
+
+def scores_courants(scores, instant=None):
+    """Ramène des scores stockés (lus dans la transaction en cours) à leur valeur à la date donnée (par défaut : maintenant)."""
+    facteur = math.exp(-_taux() * _jours(instant or maintenant(), reference()))
+    # Les retraits successifs peuvent laisser un résidu négatif d'arrondi
+    return np.maximum(np.asarray(scores, dtype=np.float64) * facteur, 0.0)
+
+
+def recalculer_affinites(user_id=None):
+    """Reconstruit les scores d'un utilisateur (ou de tous) à partir des tables d'interactions ; retourne le nombre de lignes."""
+    def requete(*colonnes):
+        q = db.session.query(*colonnes)
+        return q.filter(colonnes[0] == user_id) if user_id is not None else q
+
+    rows = (
+        [(u, c, POIDS_AFFINITE["consultation"], str(d)) for u, c, d in requete(
+            Historique_Consultation.user_id, Historique_Consultation.cours_id, Historique_Consultation.date_consultation)]
+        + [(u, c, POIDS_AFFINITE["favori"], d) for u, c, d in requete(Favoris.user_id, Favoris.cours_id, Favoris.date_ajout)]
+        + [(u, c, POIDS_AFFINITE["avis"] * n, d) for u, c, n, d in requete(Avis.user_id, Avis.cours_id, Avis.note, Avis.date)]
+    )
+
+    (Affinites.query.filter_by(user_id=user_id) if user_id is not None else Affinites.query).delete()
+    if not rows:
+        return 0
+
+    users, cours, poids, dates = zip(*rows)
+    dates = np.array([d or maintenant().isoformat(" ") for d in dates], dtype="datetime64[s]")
+    jours = (dates - np.datetime64(_reference_pour(maintenant()), "s")) / np.timedelta64(1, "D")
+    valeurs = np.array(poids, dtype=np.float64) * np.exp(_taux() * jours)
+
+    user_ids, lignes = np.unique(np.array(users, dtype=str), return_inverse=True)
+    cours_ids, colonnes = np.unique(np.array(cours, dtype=np.int64), return_inverse=True)
+    paires, inverse = np.unique(lignes * len(cours_ids) + colonnes, return_inverse=True)
+    totaux = np.bincount(inverse, weights=valeurs)
+
+    db.session.execute(insert(Affinites), [
+        {"user_id": str(user_ids[p // len(cours_ids)]), "cours_id": int(cours_ids[p % len(cours_ids)]), "score": float(s)}
+        for p, s in zip(paires.tolist(), totaux.tolist())
+    ])
+    return len(paires)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utilisateur", help="ne recalculer que cet utilisateur")
+    args = parser.parse_args()
+
+    with app.app_context():
+        debut = time.perf_counter()
+        n = recalculer_affinites(args.utilisateur)
+        db.session.commit()
+        print(f"📌 {n} affinité(s) recalculée(s) en {time.perf_counter() - debut:.1f}s")
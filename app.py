@@ -2,9 +2,13 @@ from auth import auth_bp
 from users import users_bp
 from courses import courses_bp
 from security import security_bp
+from export import export_bp
 
 from flask_cors import CORS
-from Models import app
+from Models import app, db
+from init_db import initialiser
+from json_rapide import installer_json
+from compression import activer_compression
 
 
 CORS(app, supports_credentials=True, resources={
@@ -12,14 +16,25 @@ CORS(app, supports_credentials=True, resources={
         "origins": ["http://localhost:3000"],
         "methods": ["GET", "POST", "PUT", "DELETE"],
         "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["X-Curseur-Suivant", "X-Total-Estime", "Content-Disposition"],
         "supports_credentials": True
     }})
 
+# Encodage JSON (orjson si disponible) et compression gzip/brotli des réponses volumineuses
+installer_json(app)
+activer_compression(app)
+
+# Schéma de la base SQLite mis à niveau au démarrage (tables, colonnes et index ajoutés depuis sa création)
+with app.app_context():
+    if db.engine.dialect.name == "sqlite" and db.engine.url.database not in (None, "", ":memory:"):
+        initialiser(db.engine.url.database)
+
 
 app.register_blueprint(auth_bp, url_prefix="")
 app.register_blueprint(users_bp, url_prefix="")
 app.register_blueprint(courses_bp, url_prefix="")
 app.register_blueprint(security_bp, url_prefix="")
+app.register_blueprint(export_bp, url_prefix="")
 
 
 @app.route('/')
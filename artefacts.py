@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+from Models import app
+
+# Artefacts calculés hors ligne (facteurs ALS, table des cours similaires, matrice du catalogue, ...).
+# Chaque publication crée un dossier de version <nom>/<version>/ contenant un fichier .npy par tableau ;
+# le fichier <nom>/COURANT désigne la version en service et n'est remplacé qu'une fois la version écrite.
+# Les processus lisent les tableaux avec np.load(mmap_mode='r') : les pages sont partagées entre workers
+# par le cache du système, et une nouvelle version est prise en compte sans redémarrage.
+app.config.setdefault('RECO_MODELES_DIR', os.path.join(app.instance_path, 'modeles'))
+app.config.setdefault('RECO_VERSIONS_CONSERVEES', 3)
+
+POINTEUR = "COURANT"
+
+
+def dossier_artefact(nom):
+    return os.path.join(app.config['RECO_MODELES_DIR'], nom)
+
+
+def publier(nom, tableaux, meta=None):
+    """Écrit une nouvelle version de l'artefact {clé: ndarray ou matrice creuse} et la rend courante."""
+    dossier = dossier_artefact(nom)
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    temporaire = os.path.join(dossier, f".{version}.{os.getpid()}")
+    os.makedirs(temporaire)
+
+    creuses = {}
+    for cle, valeur in tableaux.items():
+        if sparse.issparse(valeur):
+            valeur = valeur.tocsr()
+            creuses[cle] = list(valeur.shape)
+            for partie in ("data", "indices", "indptr"):
+                np.save(os.path.join(temporaire, f"{cle}.{partie}.npy"), getattr(valeur, partie))
+        else:
+            valeur = np.asarray(valeur)
+            if valeur.dtype == object:
+                valeur = valeur.astype(str)  # un tableau d'objets Python ne peut pas être projeté en mémoire
+            np.save(os.path.join(temporaire, f"{cle}.npy"), valeur)
+    with open(os.path.join(temporaire, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"cles": list(tableaux), "creuses": creuses, "meta": meta or {}}, f, ensure_ascii=False)
+
+    # La version n'est visible qu'une fois complète, puis le pointeur est remplacé atomiquement
+    os.rename(temporaire, os.path.join(dossier, version))
+    pointeur = os.path.join(dossier, f"{POINTEUR}.{os.getpid()}.tmp")
+    with open(pointeur, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointeur, os.path.join(dossier, POINTEUR))
+
+    _nettoyer(dossier, version)
+    return os.path.join(dossier, version)
+
+
+def _nettoyer(dossier, courante):
+    # Les anciennes versions au-delà de RECO_VERSIONS_CONSERVEES sont supprimées ; un processus qui
+    # les projette encore garde ses pages (Linux), et sous Windows la suppression échoue sans gravité
+    versions = sorted(v for v in os.listdir(dossier) if not v.startswith(".") and os.path.isdir(os.path.join(dossier, v)))
+    for version in versions[:-app.config['RECO_VERSIONS_CONSERVEES']]:
+        if version != courante:
+            shutil.rmtree(os.path.join(dossier, version), ignore_errors=True)
+
+
+def _lire_version(dossier, version):
+    chemin = os.path.join(dossier, version)
+    with open(os.path.join(chemin, "meta.json"), encoding="utf-8") as f:
+        description = json.load(f)
+    tableaux = {}
+    for cle in description["cles"]:
+        if cle in description["creuses"]:
+            data, indices, indptr = (np.load(os.path.join(chemin, f"{cle}.{partie}.npy"), mmap_mode="r")
+                                     for partie in ("data", "indices", "indptr"))
+            tableaux[cle] = sparse.csr_matrix((data, indices, indptr), shape=tuple(description["creuses"][cle]))
+        else:
+            tableaux[cle] = np.load(os.path.join(chemin, f"{cle}.npy"), mmap_mode="r")
+    tableaux["meta"] = description["meta"]
+    tableaux["version"] = version
+    return tableaux
+
+
+# Version chargée par ce processus pour chaque artefact, rechargée quand le pointeur change
+_artefacts_lock = threading.Lock()
+_artefacts = {}
+
+
+def charger(nom):
+    """Tableaux (en lecture seule) de la version courante de l'artefact, avec 'meta' et 'version' ; None si absent."""
+    dossier = dossier_artefact(nom)
+    try:
+        etat = os.stat(os.path.join(dossier, POINTEUR))
+    except OSError:
+        return None
+    cle_pointeur = (etat.st_ino, etat.st_mtime_ns, etat.st_size)
+    with _artefacts_lock:
+        if nom not in _artefacts or _artefacts[nom][0] != cle_pointeur:
+            with open(os.path.join(dossier, POINTEUR), encoding="utf-8") as f:
+                version = f.read().strip()
+            _artefacts[nom] = (cle_pointeur, _lire_version(dossier, version))
+        return _artefacts[nom][1]
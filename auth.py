@@ -14,6 +14,7 @@ import uuid
 from Models import bcrypt
 
 from Models import db, login_manager, Utilisateurs, Profils_Utilisateurs,mail, app
+from courses import cours_recommandes
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -140,6 +141,14 @@ def register():
         db.session.add(profil)
         db.session.commit()
 
+        # Préchauffage du fil de recommandations (servi depuis la liste du segment du profil) :
+        # le compte est déjà créé, un échec ici ne doit pas faire échouer l'inscription
+        try:
+            cours_recommandes(new_user.id_user)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Préchauffage des recommandations impossible pour %s", new_id)
+
         return jsonify({'message': 'Inscription réussie'}), 201
     return jsonify({'errors': form.errors}), 400
 
@@ -0,0 +1,209 @@
+"""Génère un catalogue et un journal d'interactions synthétiques dans une base vide, par insertions en masse.
+
+La base cible est celle de DATABASE_URL ; pour SQLite, le schéma est créé par init_db.py.
+
+Exemple : DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.donnees --users 100000 --cours 50000 --historique 10000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from Models import (app, db, bcrypt, Utilisateurs, Profils_Utilisateurs, Cours, Historique_Consultation, Avis,
+                    Favoris, Cours_Stats)
+from recommendations import CATEGORIES_COURS
+from texte import normaliser
+from affinites import recalculer_affinites
+
+DOMAINES_PROFIL = ('Informatique', 'Mathématiques', 'Physique', 'Langues')
+
+
+def _inserer(modele, lignes, taille_lot=50000):
+    # executemany par lots : une instruction INSERT préparée pour tout le lot
+    for debut in range(0, len(lignes), taille_lot):
+        db.session.execute(insert(modele), lignes[debut:debut + taille_lot])
+    db.session.commit()
+
+
+def _tirer(rng, cumul, n):
+    # Tirage pondéré à partir des poids cumulés (normalisés à 1)
+    return np.minimum(np.searchsorted(cumul, rng.random(n)), len(cumul) - 1)
+
+
+def generer_cours(rng, n_cours):
+    """Cours aux attributs tirés parmi les valeurs autorisées ; retourne leurs domaines et popularités."""
+    colonnes = {nom: rng.integers(0, len(valeurs), size=n_cours) for nom, valeurs in CATEGORIES_COURS.items()}
+    _inserer(Cours, [{
+        "id_cours": i + 1,
+        "nom": f"Cours synthétique {i + 1}",
+        "nom_normalise": normaliser(f"Cours synthétique {i + 1}"),
+        **{nom: CATEGORIES_COURS[nom][colonnes[nom][i]] for nom in CATEGORIES_COURS},
+        "durée": int(rng.integers(10, 240)),
+        "chemin_source": f"cours/synthetique/{i + 1}.pdf",
+        "nombre_vues": 0,
+    } for i in range(n_cours)])
+
+    # Popularité en loi de Zipf : quelques cours concentrent l'essentiel des consultations
+    popularite = 1.0 / np.arange(1, n_cours + 1) ** 1.0
+    rng.shuffle(popularite)
+    qualite = rng.uniform(2.0, 5.0, size=n_cours)
+    domaines = np.array(CATEGORIES_COURS["domaine"], dtype=object)[colonnes["domaine"]]
+    return domaines, popularite, qualite
+
+
+def generer_utilisateurs(rng, n_users):
+    """Utilisateurs et profils ; un seul hachage de mot de passe partagé pour rester rapide."""
+    ids = np.array([f"R{n}" for n in rng.choice(900000000, size=n_users, replace=False) + 100000000], dtype=object)
+    domaines = rng.integers(0, len(DOMAINES_PROFIL), size=n_users)
+    objectifs = rng.integers(0, len(CATEGORIES_COURS["objectifs"]), size=n_users)
+    mot_de_passe = bcrypt.generate_password_hash('testtest').decode('utf-8')
+    maintenant = datetime.now()
+
+    _inserer(Utilisateurs, [{
+        "id_user": ids[i],
+        "nom": "bench",
+        "prenom": str(i),
+        "email": f"bench{i}@test.com",
+        "mot_de_passe": mot_de_passe,
+        "date_inscription": maintenant,
+        "rôle": "user",
+    } for i in range(n_users)])
+    _inserer(Profils_Utilisateurs, [{
+        "user_id": ids[i],
+        "domaine_intérêt": DOMAINES_PROFIL[domaines[i]],
+        "objectifs": CATEGORIES_COURS["objectifs"][objectifs[i]],
+    } for i in range(n_users)])
+    return ids, np.array(DOMAINES_PROFIL, dtype=object)[domaines]
+
+
+def generer_interactions(rng, user_ids, user_domaines, cours_domaines, popularite, qualite, n_historique,
+                         part_avis=0.1, part_favoris=0.03, part_domaine=0.7, jours=365, taille_bloc=10000):
+    """Consultations (70 % dans le domaine du profil), avis et favoris, insérés par blocs d'utilisateurs."""
+    n_cours = len(popularite)
+    cumul_global = np.cumsum(popularite) / popularite.sum()
+    par_domaine = {}
+    for domaine in DOMAINES_PROFIL:
+        cours = np.flatnonzero(cours_domaines == domaine)
+        if len(cours):
+            par_domaine[domaine] = (cours, np.cumsum(popularite[cours]) / popularite[cours].sum())
+
+    # Nombre de consultations par utilisateur : loi géométrique de moyenne n_historique / n_users
+    moyenne = max(n_historique / len(user_ids), 1.0)
+    nb = rng.geometric(1.0 / moyenne, size=len(user_ids))
+    nb = np.maximum(np.round(nb * n_historique / nb.sum()).astype(np.int64), 1)
+
+    debut_periode = datetime.combine(datetime.now().date() - timedelta(days=jours), datetime.min.time())
+    totaux = {"vues": np.zeros(n_cours, np.int64), "avis": np.zeros(n_cours, np.int64),
+              "notes": np.zeros(n_cours, np.int64), "favoris": np.zeros(n_cours, np.int64)}
+    compte = {"historique": 0, "avis": 0, "favoris": 0}
+
+    for bloc in range(0, len(user_ids), taille_bloc):
+        users = np.arange(bloc, min(bloc + taille_bloc, len(user_ids)))
+        lignes = np.repeat(users, nb[users])
+        cours = _tirer(rng, cumul_global, len(lignes))
+        dans_domaine = rng.random(len(lignes)) < part_domaine
+        for domaine, (ids_domaine, cumul) in par_domaine.items():
+            masque = dans_domaine & (user_domaines[lignes] == domaine)
+            cours[masque] = ids_domaine[_tirer(rng, cumul, int(masque.sum()))]
+
+        # Une consultation par utilisateur, cours et jour (contrainte unique_user_cours)
+        secondes = rng.integers(0, jours * 86400, size=len(lignes))
+        _, uniques = np.unique((lignes * n_cours + cours) * jours + secondes // 86400, return_index=True)
+        lignes, cours, secondes = lignes[uniques], cours[uniques], secondes[uniques]
+        instants = [debut_periode + timedelta(seconds=int(s)) for s in secondes]
+        _inserer(Historique_Consultation, [{
+            "user_id": user_ids[u],
+            "cours_id": int(c) + 1,
+            "date_consultation": t.date(),
+            "heure_consultation": t.time().replace(microsecond=0),
+        } for u, c, t in zip(lignes, cours, instants)])
+
+        avis = np.flatnonzero(rng.random(len(lignes)) < part_avis)
+        notes = np.clip(np.round(qualite[cours[avis]] + rng.normal(0, 0.8, size=len(avis))), 1, 5).astype(np.int64)
+        _inserer(Avis, [{
+            "user_id": user_ids[lignes[j]],
+            "cours_id": int(cours[j]) + 1,
+            "note": int(n),
+            "date": instants[j].strftime("%Y-%m-%d %H:%M:%S"),
+        } for j, n in zip(avis, notes)])
+
+        # Un favori par couple (utilisateur, cours)
+        favoris = np.flatnonzero(rng.random(len(lignes)) < part_favoris)
+        _, uniques = np.unique(lignes[favoris] * n_cours + cours[favoris], return_index=True)
+        favoris = favoris[uniques]
+        _inserer(Favoris, [{
+            "user_id": user_ids[lignes[j]],
+            "cours_id": int(cours[j]) + 1,
+            "date_ajout": instants[j].strftime("%Y-%m-%d %H:%M:%S"),
+        } for j in favoris])
+
+        totaux["vues"] += np.bincount(cours, minlength=n_cours)
+        totaux["avis"] += np.bincount(cours[avis], minlength=n_cours)
+        totaux["notes"] += np.bincount(cours[avis], weights=notes, minlength=n_cours).astype(np.int64)
+        totaux["favoris"] += np.bincount(cours[favoris], minlength=n_cours)
+        compte["historique"] += len(lignes)
+        compte["avis"] += len(avis)
+        compte["favoris"] += len(favoris)
+        print(f"  {users[-1] + 1}/{len(user_ids)} utilisateurs, {compte['historique']} consultations")
+
+    return totaux, compte
+
+
+def finaliser_cours(totaux):
+    """nombre_vues et Cours_Stats cohérents avec les interactions générées."""
+    db.session.execute(insert(Cours_Stats), [{
+        "cours_id": i + 1,
+        "somme_notes": int(totaux["notes"][i]),
+        "nombre_avis": int(totaux["avis"][i]),
+        "moyenne": float(totaux["notes"][i] / totaux["avis"][i]) if totaux["avis"][i] else 0.0,
+        "nombre_favoris": int(totaux["favoris"][i]),
+        "nombre_consultations": int(totaux["vues"][i]),
+    } for i in range(len(totaux["vues"]))])
+    db.session.execute(
+        Cours.__table__.update().where(Cours.id_cours == db.bindparam("b_id")).values(nombre_vues=db.bindparam("b_vues")),
+        [{"b_id": i + 1, "b_vues": int(v)} for i, v in enumerate(totaux["vues"])],
+    )
+    db.session.commit()
+
+
+def creer_schema():
+    url = db.engine.url
+    if url.get_backend_name() == "sqlite":
+        racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, os.path.join(racine, "init_db.py"), url.database], check=True)
+    else:
+        db.create_all()
+
+
+def generer(n_users, n_cours, n_historique, graine=0):
+    rng = np.random.default_rng(graine)
+    creer_schema()
+    if db.session.query(Cours.id_cours).first() is not None:
+        raise SystemExit("La base cible contient déjà des cours : utilisez une base vide (DATABASE_URL).")
+
+    cours_domaines, popularite, qualite = generer_cours(rng, n_cours)
+    user_ids, user_domaines = generer_utilisateurs(rng, n_users)
+    totaux, compte = generer_interactions(rng, user_ids, user_domaines, cours_domaines, popularite, qualite, n_historique)
+    finaliser_cours(totaux)
+    recalculer_affinites()
+    db.session.commit()
+    return {"users": n_users, "cours": n_cours, **compte}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--cours", type=int, default=5000)
+    parser.add_argument("--historique", type=int, default=200000, help="nombre de consultations à générer")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    with app.app_context():
+        debut = time.perf_counter()
+        compte = generer(args.users, args.cours, args.historique, args.graine)
+        print(f"📌 {compte} générés en {time.perf_counter() - debut:.1f}s dans {app.config['SQLALCHEMY_DATABASE_URI']}")
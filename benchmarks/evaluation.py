@@ -0,0 +1,180 @@
+"""Évalue la qualité des stratégies de recommandation par découpage temporel sur un instantané SQLite.
+
+L'instantané est une copie de la base dont on retire les consultations, avis et favoris postérieurs
+à la date de coupure ; les cours consultés ou notés après cette date servent de vérité terrain.
+Pour chaque stratégie : precision@k, recall@k, NDCG@k, couverture du catalogue et latence par utilisateur.
+
+Exemple : python -m benchmarks.evaluation --base instance/recommandation.db --k 10 --entrainer --sortie evaluation
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def _init_db(chemin):
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, os.path.join(racine, "init_db.py"), chemin], check=True)
+
+
+def preparer_instantane(source, destination, part_test=0.2):
+    """Copie la base, retire la période de test et retourne (date de coupure, {user_id: cours de test})."""
+    shutil.copyfile(source, destination)
+    _init_db(destination)  # tables récentes absentes d'une base plus ancienne
+    conn = sqlite3.connect(destination)
+    c = conn.cursor()
+
+    # Coupure au jour près : les heures ne sont pas stockées de façon homogène
+    n = c.execute("SELECT COUNT(*) FROM Historique_Consultation").fetchone()[0]
+    if n == 0:
+        raise SystemExit("Historique_Consultation est vide : rien à évaluer.")
+    coupure = c.execute(
+        "SELECT date_consultation FROM Historique_Consultation ORDER BY date_consultation LIMIT 1 OFFSET ?",
+        (min(int(n * (1 - part_test)), n - 1),)
+    ).fetchone()[0]
+
+    tests = {}
+    for user_id, cours_id in c.execute('''
+        SELECT user_id, cours_id FROM Historique_Consultation WHERE date_consultation >= :coupure
+        UNION
+        SELECT user_id, cours_id FROM Avis WHERE substr(date, 1, 10) >= :coupure
+    ''', {"coupure": coupure}):
+        tests.setdefault(str(user_id), set()).add(cours_id)
+
+    # Les vues de la période de test sont retirées du compteur des cours
+    c.execute('''
+        UPDATE Cours SET nombre_vues = MAX(0, nombre_vues - (
+            SELECT COUNT(*) FROM Historique_Consultation h
+            WHERE h.cours_id = Cours.id_cours AND h.date_consultation >= ?))
+    ''', (coupure,))
+    c.execute("DELETE FROM Historique_Consultation WHERE date_consultation >= ?", (coupure,))
+    c.execute("DELETE FROM Avis WHERE substr(date, 1, 10) >= ?", (coupure,))
+    c.execute("DELETE FROM Favoris WHERE substr(date_ajout, 1, 10) >= ?", (coupure,))
+    for table in ("Cours_Stats", "Affinites", "Recommandations", "Recommandations_Etat"):
+        c.execute(f"DELETE FROM {table}")
+
+    # Un cours déjà vu ou noté avant la coupure est exclu des recommandations : il ne compte pas en test
+    for user_id, cours_id in c.execute(
+        "SELECT user_id, cours_id FROM Historique_Consultation UNION SELECT user_id, cours_id FROM Avis"
+    ):
+        tests.get(str(user_id), set()).discard(cours_id)
+    tests = {user_id: cours for user_id, cours in tests.items() if cours}
+    conn.commit()
+    conn.close()
+
+    _init_db(destination)  # recalcul des agrégats sur la période d'apprentissage
+    return coupure, tests
+
+
+def metriques(recommandes, pertinents, k):
+    """precision@k, recall@k et NDCG@k (pertinence binaire) d'une liste de recommandations."""
+    gains = np.array([cid in pertinents for cid in recommandes[:k]], dtype=np.float64)
+    remises = 1.0 / np.log2(np.arange(2, k + 2))
+    idcg = remises[:min(len(pertinents), k)].sum()
+    return {
+        "precision": gains.sum() / k,
+        "recall": gains.sum() / len(pertinents),
+        "ndcg": float(gains @ remises[:len(gains)] / idcg) if idcg else 0.0,
+    }
+
+
+def evaluer(tests, k=10, max_users=1000, entrainer=False, graine=0):
+    # Importés ici : DATABASE_URL doit déjà désigner l'instantané lors du chargement de Models
+    from Models import app, db, Cours
+    from affinites import recalculer_affinites
+    from cache import vider_caches
+    from courses import cours_recommandes
+    from recommendations import (content_similarity_recommendations, collaborative_knn_recommendations,
+                                 item_item_recommendations, als_recommendations, hybrid_recommendations)
+
+    strategies = {
+        "content": lambda u: [c.id_cours for c in content_similarity_recommendations(u, top_n=k)],
+        "collaborative": lambda u: [c.id_cours for c in collaborative_knn_recommendations(u, top_n=k)],
+        "item_item": lambda u: [c.id_cours for c in item_item_recommendations(u, top_n=k)],
+        "als": lambda u: [c.id_cours for c in als_recommendations(u, top_n=k)],
+        "hybride": lambda u: [c.id_cours for c in hybrid_recommendations(u, top_n=k)],
+        "populaire": lambda u: [c["id_cours"] for c in cours_recommandes(u)[:k]],
+    }
+
+    with app.app_context():
+        # Affinités recalculées sur la période d'apprentissage, comme les agrégats
+        recalculer_affinites()
+        db.session.commit()
+        if entrainer:
+            # Les artefacts hors ligne sont recalculés sur la seule période d'apprentissage
+            from factorisation import matrice_implicite, entrainer_als, enregistrer_als
+            from voisins_cours import calculer_voisins_cours, enregistrer_voisins_cours
+            enregistrer_voisins_cours(calculer_voisins_cours())
+            matrice, user_ids, cours_ids = matrice_implicite()
+            enregistrer_als(user_ids, cours_ids, *entrainer_als(matrice))
+        n_cours = Cours.query.count()
+
+    rng = np.random.default_rng(graine)
+    users = sorted(tests)
+    if len(users) > max_users:
+        users = sorted(rng.choice(users, size=max_users, replace=False))
+
+    lignes, resume = [], {}
+    for nom, strategie in strategies.items():
+        recommandes_tous = set()
+        for user_id in users:
+            vider_caches()
+            debut = time.perf_counter()
+            with app.app_context():
+                recommandes = strategie(user_id)
+            latence = (time.perf_counter() - debut) * 1000
+            recommandes_tous.update(recommandes)
+            lignes.append({"strategie": nom, "user_id": user_id, "n_recommandes": len(recommandes),
+                           "latence_ms": latence, **metriques(recommandes, tests[user_id], k)})
+
+        mesures = [l for l in lignes if l["strategie"] == nom]
+        latences = np.array([l["latence_ms"] for l in mesures])
+        resume[nom] = {
+            **{f"{m}@{k}": float(np.mean([l[m] for l in mesures])) for m in ("precision", "recall", "ndcg")},
+            "couverture": len(recommandes_tous) / n_cours if n_cours else 0.0,
+            "sans_resultat": sum(l["n_recommandes"] == 0 for l in mesures) / len(mesures),
+            **{f"latence_p{q}_ms": float(np.percentile(latences, q)) for q in (50, 95, 99)},
+        }
+        print(f"  {nom} : ndcg@{k} {resume[nom][f'ndcg@{k}']:.4f}, p50 {resume[nom]['latence_p50_ms']:.1f} ms", file=sys.stderr)
+    return users, lignes, resume
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default=os.path.join("instance", "recommandation.db"), help="base SQLite source (non modifiée)")
+    parser.add_argument("--part-test", type=float, default=0.2, help="part la plus récente de l'historique gardée pour le test")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-users", type=int, default=1000)
+    parser.add_argument("--entrainer", action="store_true", help="recalculer voisins_cours et ALS sur l'instantané")
+    parser.add_argument("--sortie", default="evaluation", help="préfixe des fichiers .csv (par utilisateur) et .json (résumé)")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    dossier = tempfile.mkdtemp(prefix="evaluation_")
+    instantane = os.path.join(dossier, "instantane.db")
+    coupure, tests = preparer_instantane(args.base, instantane, args.part_test)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{instantane}"
+    from Models import app
+    app.config['RECO_MODELES_DIR'] = os.path.join(dossier, "modeles")
+    app.config['RECO_DELAI_HYBRIDE'] = None  # la qualité est mesurée sans dégradation par le délai
+
+    users, lignes, resume = evaluer(tests, args.k, args.max_users, args.entrainer)
+
+    with open(args.sortie + ".csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(lignes[0]) if lignes else ["strategie"])
+        writer.writeheader()
+        writer.writerows(lignes)
+    with open(args.sortie + ".json", "w", encoding="utf-8") as f:
+        json.dump({"base": args.base, "coupure": coupure, "k": args.k, "utilisateurs": len(users),
+                   "strategies": resume}, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(dossier, ignore_errors=True)
+    print(f"📌 {len(users)} utilisateurs évalués (coupure {coupure}) en {time.perf_counter() - debut:.1f}s → {args.sortie}.csv / .json")
@@ -0,0 +1,147 @@
+"""Mesure la latence (percentiles) et le pic mémoire des fonctions de recommandation, en rapport JSON.
+
+Sans --echelles, la base mesurée est celle de DATABASE_URL. Avec --echelles, une base synthétique
+est générée pour chaque taille (users:cours:historique) puis mesurée dans un processus séparé.
+
+Exemples :
+  DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.latence --requetes 200 --sortie latence.json
+  python -m benchmarks.latence --echelles 10000:5000:200000 100000:50000:10000000 --sortie latence.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from Models import app, db, Utilisateurs, Cours, Historique_Consultation, Avis, Favoris
+from cache import vider_caches
+from courses import cours_recommandes
+from recommendations import (content_similarity_recommendations, collaborative_knn_recommendations,
+                             hybrid_recommendations)
+
+FONCTIONS = {
+    "content_similarity_recommendations": content_similarity_recommendations,
+    "collaborative_knn_recommendations": collaborative_knn_recommendations,
+    "hybrid_recommendations": hybrid_recommendations,
+    "cours_recommandes": cours_recommandes,
+}
+
+
+def _appeler(fonction, user_id):
+    # Contexte neuf (g vide) et caches de résultats vidés : on mesure le calcul, pas le cache
+    vider_caches()
+    with app.app_context():
+        fonction(user_id)
+
+
+def mesurer_fonction(fonction, user_ids, n_memoire=20):
+    """Premier appel (chargement des modèles), percentiles sur les appels suivants et pic mémoire d'un appel."""
+    debut = time.perf_counter()
+    _appeler(fonction, user_ids[0])
+    premier_appel = time.perf_counter() - debut
+
+    latences = []
+    for user_id in user_ids:
+        debut = time.perf_counter()
+        _appeler(fonction, user_id)
+        latences.append(time.perf_counter() - debut)
+    latences = np.array(latences) * 1000
+
+    # Pic mémoire mesuré à part : tracemalloc ralentit fortement les allocations
+    pics = []
+    tracemalloc.start()
+    for user_id in user_ids[:n_memoire]:
+        tracemalloc.reset_peak()
+        avant = tracemalloc.get_traced_memory()[0]
+        _appeler(fonction, user_id)
+        pics.append(tracemalloc.get_traced_memory()[1] - avant)
+    tracemalloc.stop()
+
+    return {
+        "premier_appel_ms": premier_appel * 1000,
+        "moyenne_ms": float(latences.mean()),
+        **{f"p{q}_ms": float(np.percentile(latences, q)) for q in (50, 90, 95, 99)},
+        "max_ms": float(latences.max()),
+        "pic_memoire_mo": max(pics) / 2 ** 20 if pics else None,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def mesurer(n_requetes=200, fonctions=FONCTIONS, graine=0):
+    """Rapport pour la base courante : tailles des tables et mesures de chaque fonction."""
+    rng = np.random.default_rng(graine)
+    with app.app_context():
+        tailles = {
+            "users": Utilisateurs.query.count(),
+            "cours": Cours.query.count(),
+            "historique": Historique_Consultation.query.count(),
+            "avis": Avis.query.count(),
+            "favoris": Favoris.query.count(),
+        }
+        # Utilisateurs actifs tirés au hasard (ceux qui n'ont aucune interaction passent par le repli)
+        actifs = np.array([u for (u,) in db.session.query(Historique_Consultation.user_id).distinct()], dtype=object)
+    user_ids = list(rng.choice(actifs, size=min(n_requetes, len(actifs)), replace=False)) if len(actifs) else []
+    if not user_ids:
+        raise SystemExit("Aucun utilisateur avec un historique dans la base mesurée.")
+
+    resultats = {}
+    for nom, fonction in fonctions.items():
+        resultats[nom] = mesurer_fonction(fonction, user_ids)
+        print(f"  {nom} : p50 {resultats[nom]['p50_ms']:.1f} ms, p99 {resultats[nom]['p99_ms']:.1f} ms", file=sys.stderr)
+    return {"tailles": tailles, "requetes": len(user_ids), "fonctions": resultats}
+
+
+def mesurer_echelles(echelles, n_requetes, dossier):
+    """Génère puis mesure une base par échelle, chacune dans son propre processus (caches et moteur distincts)."""
+    rapports = []
+    for echelle in echelles:
+        n_users, n_cours, n_historique = echelle.split(":")
+        chemin = os.path.join(dossier, f"bench_{n_users}_{n_cours}_{n_historique}.db")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.abspath(chemin)}")
+        if not os.path.exists(chemin):
+            subprocess.run([sys.executable, "-m", "benchmarks.donnees", "--users", n_users, "--cours", n_cours,
+                            "--historique", n_historique], env=env, check=True)
+        sortie = subprocess.run([sys.executable, "-m", "benchmarks.latence", "--requetes", str(n_requetes)],
+                                env=env, check=True, capture_output=True, text=True).stdout
+        rapports.extend(json.loads(sortie)["mesures"])
+    return rapports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requetes", type=int, default=200, help="nombre d'utilisateurs mesurés")
+    parser.add_argument("--echelles", nargs="+", help="tailles users:cours:historique à générer et mesurer")
+    parser.add_argument("--dossier", default=tempfile.gettempdir(), help="dossier des bases générées")
+    parser.add_argument("--sortie", help="fichier JSON du rapport (sortie standard par défaut)")
+    args = parser.parse_args()
+
+    # Artefacts (matrice du catalogue, ...) de la base mesurée isolés de ceux de l'application
+    app.config['RECO_MODELES_DIR'] = tempfile.mkdtemp(prefix="latence_")
+
+    debut = time.perf_counter()
+    if args.echelles:
+        mesures = mesurer_echelles(args.echelles, args.requetes, args.dossier)
+    else:
+        mesures = [mesurer(args.requetes)]
+    rapport = {"commit": _commit(), "date": datetime.now().isoformat(timespec="seconds"), "mesures": mesures}
+
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte)
+        print(f"📌 {len(mesures)} échelle(s) mesurée(s) en {time.perf_counter() - debut:.1f}s → {args.sortie}")
+    else:
+        print(texte)
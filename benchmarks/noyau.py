@@ -0,0 +1,83 @@
+"""Microbenchmarks du noyau de classement (noyau.py) face aux boucles Python qu'il remplace.
+
+Exemple : python -m benchmarks.noyau --cours 10000 100000 --k 20
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.rappel_voisins import generer_notes
+from noyau import agreger_lignes, masque_exclusion, top_k
+
+
+def _chronometrer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees) * 1000)
+
+
+def classement_contenu(n_cours, top_n=20, n_vus=200, repetitions=20, graine=0):
+    """Tri complet + compréhension de liste contre masque d'exclusion + top-k (similarités de contenu)."""
+    rng = np.random.default_rng(graine)
+    ids = np.arange(1, n_cours + 1, dtype=np.int64)
+    similarites = rng.random(n_cours)
+    vus = np.sort(rng.choice(ids, size=min(n_vus, n_cours), replace=False))
+    vus_set = set(vus.tolist())
+
+    def avant():
+        ordre = similarites.argsort()[::-1]
+        return [int(ids[i]) for i in ordre if ids[i] not in vus_set][:top_n]
+
+    def apres():
+        return ids[top_k(similarites, top_n, exclus=masque_exclusion(ids, vus))].tolist()
+
+    assert avant() == apres()
+    return {"avant_ms": _chronometrer(avant, repetitions), "apres_ms": _chronometrer(apres, repetitions)}
+
+
+def agregation_voisins(n_cours, n_users=20000, k=20, top_n=20, repetitions=20, graine=0):
+    """Parcours Python des notes des voisins contre agrégation vectorisée (bincount) + top-k."""
+    rng = np.random.default_rng(graine)
+    matrice = generer_notes(n_users, n_cours, notes_par_user=max(15, n_cours // 200), graine=graine)
+    voisins = rng.choice(n_users, size=k, replace=False)
+    vus = set(rng.choice(n_cours, size=50, replace=False).tolist())
+    colonnes_vues = np.array(sorted(vus))
+
+    def avant():
+        recommandes = {}
+        for uid in voisins:
+            ligne = matrice[uid]
+            for j, note in zip(ligne.indices, ligne.data):
+                if j not in vus and note > 3.5:
+                    recommandes[j] = recommandes.get(j, 0) + float(note)
+        return [j for j, _ in sorted(recommandes.items(), key=lambda x: (-x[1], x[0]))][:top_n]
+
+    def apres():
+        scores = agreger_lignes(matrice, voisins, seuil=3.5)
+        exclus = scores <= 0
+        exclus[colonnes_vues] = True
+        return top_k(scores, top_n, exclus=exclus).tolist()
+
+    assert avant() == apres()
+    return {"avant_ms": _chronometrer(avant, repetitions), "apres_ms": _chronometrer(apres, repetitions)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cours", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--k", type=int, default=20, help="nombre de voisins agrégés")
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    resultats = []
+    for n_cours in args.cours:
+        for nom, mesure in (("classement_contenu", classement_contenu(n_cours, repetitions=args.repetitions)),
+                            ("agregation_voisins", agregation_voisins(n_cours, k=args.k, repetitions=args.repetitions))):
+            resultats.append({"cours": n_cours, "mesure": nom, **mesure,
+                              "gain": mesure["avant_ms"] / mesure["apres_ms"]})
+    print(json.dumps(resultats, indent=2))
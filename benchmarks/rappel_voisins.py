@@ -0,0 +1,115 @@
+"""Mesure du rappel et de la latence d'un index de voisins face à la recherche exacte.
+
+Exemple : python -m benchmarks.rappel_voisins --users 1000000 --cours 50000 --k 10 [--index lsh]
+
+Mesures (k = 10, 200 requêtes, un cœur, notes synthétiques de generer_notes) :
+  users / cours   index                                rappel  p50 / p99 (ms)   exact p50 (ms)
+  1 000 000 / 50k inverse                              1.0     1.5 / 2.6        390
+  1 000 000 / 50k lsh (n_bits déduit : 16, 2000 cand.) 0.12    5.3 / 7.8        390
+  50 000 / 20k    inverse                              1.0     0.40 / 0.58      23
+  50 000 / 20k    lsh (n_bits déduit : 12, 2000 cand.) 0.33    4.2 / 6.7        19
+Les similarités cosinus entre utilisateurs sont faibles sur ces notes creuses : les hyperplans
+aléatoires séparent les vrais voisins dès que les seaux rétrécissent. Les listes inversées restent
+exactes, pour un coût qui suit le nombre de notes des cours de l'utilisateur : sous la
+milliseconde jusqu'à 200 000 utilisateurs (0,7 ms), 1,5 ms à un million sur ces données.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy import sparse
+
+from index_voisins import IndexExact, IndexLSH, IndexInverse
+
+
+def generer_notes(n_users, n_cours, notes_par_user=15, n_groupes=200, graine=0):
+    """Matrice utilisateurs × cours synthétique : chaque utilisateur note surtout les cours favoris de son groupe."""
+    rng = np.random.default_rng(graine)
+    favoris = rng.integers(0, n_cours, size=(n_groupes, 50))
+    groupes = rng.integers(0, n_groupes, size=n_users)
+
+    nb = rng.poisson(notes_par_user, size=n_users) + 1
+    lignes = np.repeat(np.arange(n_users), nb)
+    dans_groupe = rng.random(len(lignes)) < 0.8
+    colonnes = np.where(
+        dans_groupe,
+        favoris[groupes[lignes], rng.integers(0, 50, size=len(lignes))],
+        rng.integers(0, n_cours, size=len(lignes)),
+    )
+    notes = rng.integers(1, 6, size=len(lignes)).astype(np.float32)
+
+    matrice = sparse.csr_matrix((notes, (lignes, colonnes)), shape=(n_users, n_cours))
+    matrice.data = np.minimum(matrice.data, 5)
+    matrice.sort_indices()
+    return matrice
+
+
+def _cosinus(matrice, i, lignes):
+    vecteur = matrice[i]
+    produits = np.asarray((matrice[lignes] @ vecteur.T).todense()).ravel()
+    normes = np.sqrt(np.asarray(matrice[lignes].multiply(matrice[lignes]).sum(axis=1)).ravel() * vecteur.multiply(vecteur).sum())
+    return np.divide(produits, normes, out=np.zeros_like(produits, dtype=np.float64), where=normes > 0)
+
+
+def mesurer(matrice, index, k=10, n_requetes=200, graine=1):
+    """Rappel@k de l'index (un voisin compte s'il est au moins aussi proche que le k-ième exact) et latences."""
+    rng = np.random.default_rng(graine)
+    requetes = rng.choice(matrice.shape[0], size=min(n_requetes, matrice.shape[0]), replace=False)
+    exact = IndexExact()
+
+    debut = time.perf_counter()
+    index.construire(matrice)
+    duree_construction = time.perf_counter() - debut
+
+    rappels, latences_index, latences_exact = [], [], []
+    for i in requetes:
+        debut = time.perf_counter()
+        approx = index.voisins(matrice, i, k)
+        latences_index.append(time.perf_counter() - debut)
+
+        debut = time.perf_counter()
+        reference = exact.voisins(matrice, i, k)
+        latences_exact.append(time.perf_counter() - debut)
+
+        seuil = _cosinus(matrice, i, reference).min()
+        rappels.append((_cosinus(matrice, i, approx) >= seuil - 1e-9).sum() / len(reference))
+
+    return {
+        "users": matrice.shape[0],
+        "cours": matrice.shape[1],
+        "k": k,
+        "rappel_moyen": float(np.mean(rappels)),
+        "construction_s": duree_construction,
+        "index_ms": {p: float(np.percentile(latences_index, q) * 1000) for p, q in (("p50", 50), ("p99", 99))},
+        "exact_ms": {p: float(np.percentile(latences_exact, q) * 1000) for p, q in (("p50", 50), ("p99", 99))},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--cours", type=int, default=20000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--requetes", type=int, default=200)
+    parser.add_argument("--index", choices=["inverse", "lsh"], default="inverse")
+    parser.add_argument("--n-bits", type=int, help="LSH : déduit du nombre d'utilisateurs par défaut")
+    parser.add_argument("--n-tables", type=int, default=16)
+    parser.add_argument("--sondes", type=int, default=1)
+    parser.add_argument("--taille-seau", type=int, default=16)
+    parser.add_argument("--max-candidats", type=int, default=2000)
+    args = parser.parse_args()
+
+    matrice = generer_notes(args.users, args.cours)
+    if args.index == "lsh":
+        index = IndexLSH(n_bits=args.n_bits, n_tables=args.n_tables, sondes=args.sondes, taille_seau=args.taille_seau,
+                         max_candidats=args.max_candidats, seuil_exact=0)
+    else:
+        index = IndexInverse()
+    resultat = mesurer(matrice, index, k=args.k, n_requetes=args.requetes)
+    if args.index == "lsh":
+        parametres = {"n_bits": index.n_bits, "n_tables": args.n_tables, "sondes": args.sondes,
+                      "max_candidats": args.max_candidats}
+    else:
+        parametres = {"max_modifiees": index.max_modifiees}
+    print(json.dumps({"index": args.index, "parametres": parametres, **resultat}, indent=2))
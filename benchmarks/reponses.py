@@ -0,0 +1,118 @@
+"""Mesure le temps d'encodage et les octets transmis des grandes listes JSON, par provider JSON et par encodage.
+
+Routes mesurées sur la base de DATABASE_URL : liste admin des cours, liste admin des utilisateurs et
+fil de recommandations d'un utilisateur actif, sans pagination (réponse complète).
+
+Exemple :
+  DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.reponses --repetitions 20 --sortie reponses.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+from app import app
+from Models import db, Utilisateurs, Historique_Consultation
+from benchmarks.latence import _commit
+from compression import brotli, compresser
+from json_rapide import OrjsonProvider, orjson
+from serialisation import vider_fragments
+
+ROUTES = {
+    "admin_cours": ("/api/admin/cours", "admin"),
+    "admin_users": ("/api/admin/users", "admin"),
+    "recommandations": ("/api/cours", "utilisateur"),
+}
+
+PROVIDERS = {"json": DefaultJSONProvider}
+if orjson is not None:
+    PROVIDERS["orjson"] = OrjsonProvider
+
+ENCODAGES = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+
+def _client(user_id):
+    """Client de test déjà connecté (session Flask-Login posée directement)."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = user_id
+        session["_fresh"] = True
+    return client
+
+
+def _mediane_ms(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees) * 1000)
+
+
+def _requete(client, url, encodage):
+    # Réponse lue et fermée comme par un serveur WSGI (les listes complètes sont streamées)
+    return client.get(url, headers={"Accept-Encoding": encodage}, buffered=True)
+
+
+def mesurer_route(client, url, repetitions):
+    """Octets par encodage, puis pour chaque provider : encodage seul et requête complète par encodage."""
+    reference = _requete(client, url, "identity")
+    if reference.status_code != 200:
+        raise SystemExit(f"{url} : statut {reference.status_code}")
+    corps = reference.get_data()
+    donnees = json.loads(corps)
+
+    resultat = {"elements": len(donnees), "octets": {}, "compression_ms": {}, "providers": {}}
+    for encodage in ENCODAGES:
+        if encodage == "identity":
+            resultat["octets"][encodage] = len(corps)
+            continue
+        resultat["octets"][encodage] = len(compresser(corps, encodage, app))
+        resultat["compression_ms"][encodage] = _mediane_ms(lambda: compresser(corps, encodage, app), repetitions)
+
+    for nom, provider in PROVIDERS.items():
+        app.json = provider(app)
+        vider_fragments()
+        with app.app_context():
+            encodage_ms = _mediane_ms(lambda: app.json.response(donnees), repetitions)
+        requete_ms = {}
+        for encodage in ENCODAGES:
+            _requete(client, url, encodage)  # fragments et caches chauds
+            requete_ms[encodage] = _mediane_ms(lambda: _requete(client, url, encodage), repetitions)
+        resultat["providers"][nom] = {"encodage_ms": encodage_ms, "requete_ms": requete_ms}
+        print(f"  {url} [{nom}] : encodage {encodage_ms:.1f} ms, requête "
+              + ", ".join(f"{e} {t:.1f} ms" for e, t in requete_ms.items()), file=sys.stderr)
+    return resultat
+
+
+def mesurer(repetitions=20):
+    with app.app_context():
+        admin = db.session.query(Utilisateurs.id_user).filter(Utilisateurs.rôle == "admin").limit(1).scalar()
+        actif = db.session.query(Historique_Consultation.user_id).limit(1).scalar()
+    if admin is None or actif is None:
+        raise SystemExit("Il faut un administrateur et un utilisateur avec un historique dans la base mesurée.")
+    clients = {"admin": _client(admin), "utilisateur": _client(actif)}
+    return {nom: mesurer_route(clients[role], url, repetitions) for nom, (url, role) in ROUTES.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repetitions", type=int, default=20, help="mesures par combinaison (médiane retenue)")
+    parser.add_argument("--sortie", help="fichier JSON du rapport (sortie standard par défaut)")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    rapport = {"commit": _commit(), "date": datetime.now().isoformat(timespec="seconds"),
+               "seuil_compression": app.config['COMPRESSION_SEUIL'], "routes": mesurer(args.repetitions)}
+
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte)
+        print(f"📌 {len(rapport['routes'])} route(s) mesurée(s) en {time.perf_counter() - debut:.1f}s → {args.sortie}")
+    else:
+        print(texte)
@@ -0,0 +1,122 @@
+import copy
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, has_app_context
+
+from Models import app
+from versions import version_catalogue, version_utilisateur
+
+# Taille maximale (en entrées) et durée de vie (en secondes) des caches de recommandations
+app.config.setdefault('RECO_CACHE_TAILLE', 10000)
+app.config.setdefault('RECO_CACHE_TTL', 300)
+
+
+class CacheLRU:
+    """Cache LRU avec durée de vie, dont les clés commencent par l'identifiant de l'utilisateur."""
+
+    def __init__(self, taille, ttl):
+        self.taille = taille
+        self.ttl = ttl
+        self.entrees = OrderedDict()   # clé -> (expiration, valeur)
+        self.par_utilisateur = {}      # user_id -> set(clés), pour l'invalidation ciblée
+        self.lock = threading.Lock()
+
+    def get(self, cle):
+        with self.lock:
+            entree = self.entrees.get(cle)
+            if entree is None:
+                return False, None
+            if entree[0] < time.monotonic():
+                self._retirer(cle)
+                return False, None
+            self.entrees.move_to_end(cle)
+            return True, entree[1]
+
+    def set(self, cle, valeur):
+        with self.lock:
+            self.entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            self.entrees.move_to_end(cle)
+            self.par_utilisateur.setdefault(cle[0], set()).add(cle)
+            while len(self.entrees) > self.taille:
+                self._retirer(next(iter(self.entrees)))
+
+    def invalider_utilisateur(self, user_id):
+        with self.lock:
+            for cle in self.par_utilisateur.pop(user_id, ()):
+                self.entrees.pop(cle, None)
+
+    def vider(self):
+        with self.lock:
+            self.entrees.clear()
+            self.par_utilisateur.clear()
+
+    def _retirer(self, cle):
+        self.entrees.pop(cle, None)
+        cles = self.par_utilisateur.get(cle[0])
+        if cles is not None:
+            cles.discard(cle)
+            if not cles:
+                del self.par_utilisateur[cle[0]]
+
+
+_caches = []
+_appel = threading.local()  # drapeau « résultat incomplet » de l'appel en cours, par thread
+
+
+def marquer_incomplet():
+    """Empêche la mise en cache du résultat en cours de calcul (ex : une branche a dépassé son délai)."""
+    _appel.incomplet = True
+
+
+def cache_utilisateur(fonction):
+    """Met en cache le résultat d'une fonction (user_id, ...) par utilisateur et par paramètres.
+
+    Chaque entrée porte les versions en base du catalogue et de l'utilisateur au moment du calcul :
+    une écriture faite par un autre processus la rend périmée, sans attendre la durée de vie.
+    """
+    signature = inspect.signature(fonction)
+    cache = CacheLRU(app.config['RECO_CACHE_TAILLE'], app.config['RECO_CACHE_TTL'])
+    _caches.append(cache)
+
+    @wraps(fonction)
+    def wrapper(*args, **kwargs):
+        # Les paramètres sont normalisés pour que f(u, 10) et f(u, top_n=10) partagent la même entrée
+        appel = signature.bind(*args, **kwargs)
+        appel.apply_defaults()
+        cle = tuple(appel.arguments.values())
+        versions = (version_catalogue(), version_utilisateur(cle[0]))
+
+        trouve, entree = cache.get(cle)
+        if trouve and entree[0] == versions:
+            valeur = entree[1]
+        else:
+            _appel.incomplet = False
+            valeur = fonction(*args, **kwargs)
+            if not _appel.incomplet:
+                cache.set(cle, (versions, valeur))
+            _appel.incomplet = False
+        # Copie : les appelants enrichissent parfois le résultat (ex : est_favori)
+        return copy.deepcopy(valeur)
+
+    wrapper.cache = cache
+    return wrapper
+
+
+def invalider_utilisateur(user_id):
+    """À appeler après toute écriture qui modifie les données d'un utilisateur (les autres processus suivent sa version)."""
+    for cache in _caches:
+        cache.invalider_utilisateur(user_id)
+    # Interactions et version mémorisées pour la requête en cours (voir recommendations.charger_interactions)
+    if has_app_context():
+        g.get("interactions", {}).pop(user_id, None)
+        g.get("versions_utilisateurs", {}).pop(user_id, None)
+
+
+def vider_caches():
+    """À appeler quand le catalogue change : toutes les entrées peuvent référencer un cours modifié."""
+    for cache in _caches:
+        cache.vider()
@@ -0,0 +1,73 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : seul gzip est alors proposé
+    brotli = None
+
+# Compression des réponses textuelles au-delà d'un seuil, selon l'en-tête Accept-Encoding
+# (brotli préféré à gzip à qualité égale). Le corps compressé étant différent, son ETag reçoit le
+# suffixe de l'encodage (versions.est_inchangee reconnaît les deux formes).
+SUFFIXES_ETAG = {"br": "-br", "gzip": "-gzip"}
+
+
+def _encodages():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compresser(donnees, encodage, app):
+    if encodage == "br":
+        return brotli.compress(donnees, quality=app.config['COMPRESSION_NIVEAU_BROTLI'])
+    return gzip.compress(donnees, compresslevel=app.config['COMPRESSION_NIVEAU_GZIP'], mtime=0)
+
+
+def compresser_flux(morceaux, encodage, app):
+    """Compression au fil de l'eau d'une réponse streamée (chaque morceau reçu est envoyé compressé)."""
+    if encodage == "br":
+        compresseur = brotli.Compressor(quality=app.config['COMPRESSION_NIVEAU_BROTLI'])
+        compresser_morceau, terminer = compresseur.process, compresseur.finish
+    else:
+        compresseur = zlib.compressobj(app.config['COMPRESSION_NIVEAU_GZIP'], zlib.DEFLATED, 31)  # 31 : en-tête gzip
+        compresser_morceau = compresseur.compress
+        terminer = compresseur.flush
+    for morceau in morceaux:
+        donnees = compresser_morceau(morceau)
+        if donnees:
+            yield donnees
+    yield terminer()
+
+
+def activer_compression(app):
+    app.config.setdefault('COMPRESSION_SEUIL', 1024)          # octets ; en dessous, le gain ne vaut pas le calcul
+    app.config.setdefault('COMPRESSION_NIVEAU_GZIP', 6)
+    app.config.setdefault('COMPRESSION_NIVEAU_BROTLI', 5)
+    app.config.setdefault('COMPRESSION_TYPES', ("application/json", "text/html", "text/plain", "text/csv",
+                                                  "application/x-ndjson"))
+
+    @app.after_request
+    def compresser_reponse(reponse):
+        if (reponse.mimetype not in app.config['COMPRESSION_TYPES'] or reponse.status_code < 200
+                or reponse.status_code in (204, 304) or reponse.direct_passthrough):
+            return reponse
+        reponse.vary.add("Accept-Encoding")
+        # Taille inconnue d'une réponse streamée : toujours compressée
+        trop_petite = not reponse.is_streamed and (reponse.content_length or 0) < app.config['COMPRESSION_SEUIL']
+        if "Content-Encoding" in reponse.headers or trop_petite:
+            return reponse
+        encodage = request.accept_encodings.best_match(_encodages())
+        if encodage is None:
+            return reponse
+
+        if reponse.is_streamed:
+            reponse.response = compresser_flux(reponse.response, encodage, app)
+            reponse.headers.pop("Content-Length", None)
+        else:
+            reponse.set_data(compresser(reponse.get_data(), encodage, app))
+        reponse.headers["Content-Encoding"] = encodage
+        etag, faible = reponse.get_etag()
+        if etag:
+            reponse.set_etag(etag + SUFFIXES_ETAG[encodage], faible)
+        return reponse
@@ -11,14 +11,30 @@ from wtforms.validators import DataRequired, Optional, NumberRange, URL
 import uuid
 import shutil
 import time
-from Models import db,Cours, Favoris,Utilisateurs, Historique_Consultation, Profils_Utilisateurs, Avis,app
+import numpy as np
+from Models import db,Cours, Favoris,Utilisateurs, Historique_Consultation, Profils_Utilisateurs, Avis, Recommandations, Cours_Stats, app
 from security import *
 
 from security import admin_required
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta, timezone
 
-#from recommendations import hybrid_recommendations
+from recommendations import (invalider_catalogue, maj_note, supprimer_cours_notes, cours_similaires, charger_interactions,
+                             contient, statistiques_branches, get_voisins_cours)
+from cache import cache_utilisateur, invalider_utilisateur
+from stats_cours import maj_stats_cours
+from affinites import ajouter_affinite, lire_date, POIDS_AFFINITE
+from segments import liste_segment, requete_populaires, cours_json
+from recherche import filtrer_recherche
+from suggestions import suggerer
+from pagination import lire_pagination, paginer, paginer_ids, estimer_total, reponse_paginee
+from versions import (incrementer_versions, cle_cours, cle_utilisateur, etag_requete, est_inchangee, non_modifiee,
+                      avec_etag)
+from serialisation import CHAMPS_COURS, dict_cours, objet_cours, tableau_json, reponse_json
+from json_rapide import dumps_octets
+from flux import par_lots, flux_tableau_json, reponse_flux
+from facettes import (lire_selection, ids_selection, compter_facettes, bits_ids, charger_cours, maj_cours_facettes,
+                      retirer_cours_facettes)
 
 courses_bp = Blueprint('courses', __name__)
 
@@ -151,55 +167,102 @@ def search_cours():
     user_id = current_user.id_user
     # Récupérer les paramètres de la requête
     search = request.args.get('search', '')
-    domaine = request.args.get('domaine', '')
-    type_ressource = request.args.get('type_ressource', '')
-    niveau = request.args.get('niveau', '')
-    timestamp = request.args.get('_t', '') # Paramètre timestamp ajouté pour éviter la mise en cache
-    
-    query = db.session.query(Cours)
+    # domaine, type_ressource, niveau, langue, objectifs (voir facettes.py)
+    selection = lire_selection(request.args)
+    try:
+        limite, apres = lire_pagination()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     cours_list = []
+    suivant = None
+    total = None
     
     # Appliquer les filtres si des paramètres sont présents
-    if search or domaine or type_ressource or niveau:
-        if search:
-            query = query.filter(Cours.nom.ilike(f"%{search}%"))
-        if domaine:
-            query = query.filter(Cours.domaine == domaine)
-        if type_ressource:
-            query = query.filter(Cours.type_ressource == type_ressource)
-        if niveau:
-            query = query.filter(Cours.niveau == niveau)
-        cours_list = query.all()
+    if search:
+        # Résultats classés par pertinence, filtres compris
+        query, tri = filtrer_recherche(db.session.query(Cours), search)
+        for facette, valeurs in selection.items():
+            query = query.filter(getattr(Cours, facette).in_(valeurs))
+        try:
+            if limite is None:
+                cours_list = query.order_by(*tri).all()
+            else:
+                cours_list, suivant = paginer(query, tri, limite, apres)
+                total = estimer_total(Cours, query) if apres is None else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    elif selection:
+        # Filtres seuls : résolus par l'index bitmap, seuls les cours de la page sont lus
+        ids = ids_selection(selection)
+        try:
+            page, suivant = (ids, None) if limite is None else paginer_ids(ids, limite, apres)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        cours_list = charger_cours(page)
+        total = len(ids) if apres is None else None
     else:
-        # Si aucun filtre, renvoyer les recommandations dynamiques
-        cours_list = cours_recommandes(user_id)
+        # Si aucun filtre, renvoyer les recommandations précalculées (ou dynamiques à défaut)
+        cours_list = recommandations_materialisees(user_id) or cours_recommandes(user_id)
+
+        # ETag calculé sur ce que le fil affiche : les vues, notes et scores viennent de listes en cache
+        # qui suivent l'activité des autres utilisateurs, sans compteur de version qui leur soit propre
+        etag = etag_requete("catalogue", cle_utilisateur(user_id), extra=[
+            (cours["id_cours"], cours["nombre_vues"], cours["moyenne_note"], cours["score"]) for cours in cours_list
+        ])
+        if est_inchangee(etag):
+            return non_modifiee(etag)
         
         # S'assurer que les informations de favoris sont ajoutées
-        favoris_ids = {f.cours_id for f in Favoris.query.filter_by(user_id=user_id).all()}
+        favoris_ids = charger_interactions(user_id).favoris
         
         # Ajouter l'information est_favori à chaque cours
         for cours in cours_list:
-            cours["est_favori"] = cours["id_cours"] in favoris_ids
+            cours["est_favori"] = contient(favoris_ids, cours["id_cours"])
             
-        return jsonify(cours_list), 200
+        return avec_etag(jsonify(cours_list), etag), 200
     
+    # Recherche ou filtres : ETag calculé sur les cours effectivement renvoyés et leurs compteurs de vues,
+    # plutôt que sur la version « activite » qui change à chaque consultation de n'importe quel cours
+    etag = etag_requete("catalogue", cle_utilisateur(user_id),
+                        extra=[(cours.id_cours, cours.nombre_vues) for cours in cours_list])
+    if est_inchangee(etag):
+        return non_modifiee(etag)
+
     # Pour les résultats de recherche, aussi ajouter l'information des favoris
-    favoris_ids = {f.cours_id for f in Favoris.query.filter_by(user_id=user_id).all()}
+    favoris_ids = charger_interactions(user_id).favoris
     
-    result = [{
-        "id_cours": cours.id_cours,
-        "nom": cours.nom,
-        "domaine": cours.domaine,
-        "type_ressource": cours.type_ressource,
-        "niveau": cours.niveau,
-        "langue": cours.langue,
-        "objectifs": cours.objectifs,
-        "chemin_source": cours.chemin_source,
-        "nombre_vues": cours.nombre_vues,
-        "est_favori": cours.id_cours in favoris_ids
-    } for cours in cours_list]
+    # Fragments JSON mis en cache par cours, complétés par est_favori
+    result = reponse_json([objet_cours(cours, contient(favoris_ids, cours.id_cours)) for cours in cours_list])
     
-    return jsonify(result), 200
+    if limite is None:
+        return avec_etag(result, etag), 200
+    # Total estimé sur la première page seulement : le client le conserve pour les suivantes
+    return avec_etag(reponse_paginee(result, suivant, total), etag), 200
+
+
+@courses_bp.route('/api/cours/suggest', methods=['GET'])
+@login_required_route
+def suggestions_cours():
+    """Autocomplétion des noms : ?q=<début d'un mot du nom>&n=<nombre de suggestions, 10 par défaut>."""
+    try:
+        n = min(max(int(request.args.get('n', 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "Paramètre n invalide."}), 400
+    return jsonify(suggerer(request.args.get('q', ''), n)), 200
+
+
+@courses_bp.route('/api/cours/facettes', methods=['GET'])
+@login_required_route
+def facettes_cours():
+    """Nombre de cours par valeur de chaque facette pour la sélection courante (mêmes paramètres que /api/cours)."""
+    selection = lire_selection(request.args)
+    search = request.args.get('search', '')
+    restriction = None
+    if search:
+        query, _ = filtrer_recherche(db.session.query(Cours.id_cours), search)
+        restriction = bits_ids(id_cours for (id_cours,) in query)
+    return jsonify(compter_facettes(selection, restriction)), 200
 
 
 
@@ -210,29 +273,45 @@ def AdminCours():
     # Récupérer les paramètres de la requête
     search = request.args.get('search', '')
     domaine = request.args.get('domaine', '')
-   
-    query = db.session.query(Cours)
-    cours_list = []
+    try:
+        limite, apres = lire_pagination()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    query = db.session.query(Cours)
+    tri = (Cours.id_cours,)
     # Appliquer les filtres si des paramètres sont présents
     if search or domaine:
         if search:
-            query = query.filter(Cours.nom.ilike(f"%{search}%"))
+            query, tri = filtrer_recherche(query, search)
         if domaine:
             query = query.filter(Cours.domaine == domaine)
-    cours_list = query.all()
-    
-    return jsonify([{
-            "id_cours": cours.id_cours,
-            "nom": cours.nom,
-            "domaine": cours.domaine,
-            "type_ressource": cours.type_ressource,
-            "niveau": cours.niveau,
-            "langue": cours.langue,
-            "objectifs": cours.objectifs,
-            "chemin_source": cours.chemin_source,
-            "nombre_vues": cours.nombre_vues,
-        } for cours in cours_list]), 200
+    if limite is None:
+        # Liste complète : l'ETag suit la version « activite » (tout compteur de vues modifié), le
+        # calculer sur les lignes obligerait à tout lire avant d'envoyer le premier octet
+        etag = etag_requete("catalogue", "activite")
+        if est_inchangee(etag):
+            return non_modifiee(etag)
+        # Catalogue complet : colonnes lues par lots et encodées au fil de l'eau, sans entités ORM
+        # ni fragments gardés en cache (mémoire indépendante de la taille du catalogue)
+        colonnes = query.with_entities(*[getattr(Cours, champ) for champ in CHAMPS_COURS])
+        cours_flux = (dumps_octets(app, dict(zip(CHAMPS_COURS, ligne))) for ligne in par_lots(colonnes, tri))
+        return avec_etag(reponse_flux(flux_tableau_json(cours_flux)), etag), 200
+    try:
+        cours_list, suivant = paginer(query, tri, limite, apres)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Une page : ETag des cours renvoyés et de leurs compteurs de vues
+    etag = etag_requete("catalogue", extra=[(cours.id_cours, cours.nombre_vues) for cours in cours_list])
+    if est_inchangee(etag):
+        return non_modifiee(etag)
+    
+    result = reponse_json([objet_cours(cours) for cours in cours_list])
+    total = None
+    if apres is None:
+        total = estimer_total(Cours, query if search or domaine else None)
+    return avec_etag(reponse_paginee(result, suivant, total), etag), 200
 
 
 #######
@@ -244,11 +323,18 @@ def details_cours(id_cours):
     # Incrémentation du nombre de vues
     db.session.commit()
     enregistrer_consultation(id_user=current_user.id_user, id_cours=id_cours, titre_cours=cours.nom)
+
+    # ETag calculé après l'enregistrement de la consultation, qui peut faire avancer les versions
+    voisins = get_voisins_cours()
+    etag = etag_requete("catalogue", cle_cours(id_cours), cle_utilisateur(current_user.id_user),
+                        extra=(current_user.rôle, voisins["version"] if voisins is not None else None))
+    if request.method == 'GET' and est_inchangee(etag):
+        return non_modifiee(etag)
     # Récupérer les avis du cours
     avis = Avis.query.filter_by(cours_id=id_cours).all()
 
-    favoris_cours_ids = [favori.cours.id_cours for favori in current_user.favoris]  # cette ligne crée une liste favoris_cours_ids qui contient les identifiants des cours favoris de l'utilisateur.
-    est_favori = cours.id_cours in favoris_cours_ids
+    est_favori = contient(charger_interactions(current_user.id_user).favoris, cours.id_cours)
+    stats = db.session.get(Cours_Stats, id_cours)
 
     form_schema = {
         'note': {
@@ -262,19 +348,14 @@ def details_cours(id_cours):
         }
     }
 
-    return jsonify({
-        "cours": {
-            "id_cours": cours.id_cours,
-            "nom": cours.nom,
-            "domaine": cours.domaine,
-            "type_ressource": cours.type_ressource,
-            "niveau": cours.niveau,
-            "langue": cours.langue,
-            "objectifs": cours.objectifs,
-            "chemin_source": cours.chemin_source,
-            "nombre_vues": cours.nombre_vues,
-            "est_favori": est_favori
-        },
+    # Cours et similaires assemblés à partir des fragments en cache, le reste encodé normalement
+    cours_objet = objet_cours(
+        cours, est_favori,
+        moyenne_note=stats.moyenne if stats else 0.0,
+        nombre_avis=stats.nombre_avis if stats else 0,
+        nombre_favoris=stats.nombre_favoris if stats else 0,
+    )
+    reste = dumps_octets(app, {
         "avis": [
             {
                 "id": a.id_avis,
@@ -286,7 +367,25 @@ def details_cours(id_cours):
         ],
         "form_schema": form_schema,
         "admin": current_user.rôle == "admin"
-    }), 200
+    })
+    corps = (b'{"cours":' + cours_objet + b',"similaires":' + tableau_json(cours_similaires_json(id_cours))
+             + b',' + reste[1:])
+    return avec_etag(reponse_json(corps), etag), 200
+
+
+def cours_similaires_json(id_cours, n=10):
+    """Objets JSON encodés (bytes) des cours similaires, avec leur score."""
+    # Lecture de la table précalculée (voisins_cours.py) : aucun calcul de modèle ici
+    similaires = cours_similaires(id_cours, n)
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_([cid for cid, _ in similaires])).all()}
+    return [objet_cours(cours_map[cid], score=score) for cid, score in similaires if cid in cours_map]
+
+
+@courses_bp.route('/api/cours/<int:id_cours>/similaires', methods=['GET'])
+@login_required_route
+def similaires_cours(id_cours):
+    n = min(max(request.args.get('n', 10, type=int), 1), 50)
+    return reponse_json(cours_similaires_json(id_cours, n)), 200
 
 
 ##########admin ajoute cours
@@ -372,7 +471,10 @@ def ajouter_cours():
             )
 
             db.session.add(nouveau_cours)
+            incrementer_versions("catalogue")
             db.session.commit()
+            invalider_catalogue()
+            maj_cours_facettes(nouveau_cours)
 
             return jsonify({"message": "Cours ajouté avec succès", "id": nouveau_cours.id_cours}), 201
         else:
@@ -602,7 +704,10 @@ def mettre_a_jour_cours(id_cours):
                             # Continuer pour au moins mettre à jour les métadonnées
 
             # Enregistrer les modifications dans la base de données
+            incrementer_versions("catalogue")
             db.session.commit()
+            invalider_catalogue()
+            maj_cours_facettes(cours_a_modifier)
             return jsonify({"message": "Cours modifié avec succès."}), 200
         else:
             # Renvoyer les erreurs de validation
@@ -633,13 +738,21 @@ def ajouter_favoris(id_cours):
     if favori_existant:
         # Si le cours est déjà dans les favoris, on le retire
         db.session.delete(favori_existant)
+        maj_stats_cours(id_cours, favoris=-1)
+        ajouter_affinite(user_id, id_cours, -POIDS_AFFINITE["favori"], lire_date(favori_existant.date_ajout))
+        incrementer_versions(cle_utilisateur(user_id))
         db.session.commit()
+        invalider_utilisateur(user_id)
         return jsonify({"message": "Le cours a été retiré de vos favoris.", "favori": False}), 200
 
     else:
         new_fav = Favoris(cours_id=id_cours, user_id=user_id)
         db.session.add(new_fav)
+        maj_stats_cours(id_cours, favoris=1)
+        ajouter_affinite(user_id, id_cours, POIDS_AFFINITE["favori"])
+        incrementer_versions(cle_utilisateur(user_id))
         db.session.commit()
+        invalider_utilisateur(user_id)
         return jsonify({"message": "Favoris ajouté avec succès !", "favori": True}), 201
 #######
 ###supp
@@ -662,7 +775,11 @@ def supprimer_cours(id_cours):
 
     # Supprimer le cours de la base de données
     db.session.delete(cours_a_supprimer)
+    incrementer_versions("catalogue", "notes")  # ses avis sont supprimés avec lui
     db.session.commit()
+    invalider_catalogue()
+    retirer_cours_facettes(id_cours)
+    supprimer_cours_notes(id_cours)
 
     # Message flash pour indiquer que le cours a été supprimé
     
@@ -698,6 +815,10 @@ def ajouter_avis(id_cours):
                 
                 if avis_existant:
                     if avis_existant.note != note:
+                        maj_stats_cours(id_cours, somme_notes=note - avis_existant.note)
+                        # La nouvelle note remplace l'ancienne à la date de l'avis
+                        ajouter_affinite(user_id, id_cours, POIDS_AFFINITE["avis"] * (note - avis_existant.note),
+                                         lire_date(avis_existant.date))
                         avis_existant.note = note
                         message += "Votre note a été mise à jour. "
                     
@@ -709,6 +830,8 @@ def ajouter_avis(id_cours):
                             commentaire=commentaire
                         )
                         db.session.add(nouvel_avis)
+                        maj_stats_cours(id_cours, avis=1, somme_notes=avis_existant.note)
+                        ajouter_affinite(user_id, id_cours, POIDS_AFFINITE["avis"] * avis_existant.note)
                         message += "Commentaire ajouté."
                 else:
                     nouvel_avis = Avis(
@@ -718,9 +841,19 @@ def ajouter_avis(id_cours):
                         commentaire=commentaire if commentaire else None
                     )
                     db.session.add(nouvel_avis)
+                    maj_stats_cours(id_cours, avis=1, somme_notes=note)
+                    ajouter_affinite(user_id, id_cours, POIDS_AFFINITE["avis"] * note)
                     message = "Votre avis a été enregistré avec succès."
                 
+                incrementer_versions(cle_utilisateur(user_id), "notes")
                 db.session.commit()
+                # La matrice des notes garde la moyenne des avis de l'utilisateur sur le cours,
+                # comme lors de son chargement depuis la base (un commentaire ajoute une ligne d'avis)
+                moyenne = db.session.query(func.avg(Avis.note)).filter(
+                    Avis.user_id == user_id, Avis.cours_id == id_cours
+                ).scalar()
+                maj_note(user_id, id_cours, moyenne)
+                invalider_utilisateur(user_id)
                 return jsonify({"message": message}), 201
             # Si ce n'est pas du JSON, essayer de traiter comme form-data
             else:
@@ -766,25 +899,29 @@ def enregistrer_consultation(id_user, id_cours, titre_cours):
                             )
 
         db.session.add(nouvel_historique)
+        maj_stats_cours(id_cours, consultations=1)
+        # Une consultation par jour, datée du jour comme dans l'historique
+        ajouter_affinite(id_user, id_cours, POIDS_AFFINITE["consultation"], lire_date(aujourd_hui))
+        incrementer_versions(cle_utilisateur(id_user))
         db.session.commit()
+        invalider_utilisateur(id_user)
     else:
         # Si l'historique existe déjà, mettre à jour l'heure de consultation
         historique.heure_consultation = datetime.now(timezone.utc).time()  # Cela crée un objet time
+        maj_stats_cours(id_cours)
         db.session.commit()
 
 
 ######popularrite
 
+@cache_utilisateur
 def cours_recommandes(user_id):
     utilisateur = Utilisateurs.query.get(user_id)
     if not utilisateur:
         return []
    
     # Obtenir les IDs des cours déjà vus, favoris ou notés
-    historique_ids = [h.cours_id for h in Historique_Consultation.query.filter_by(user_id=user_id).all()]
-    favoris_ids = [f.cours_id for f in Favoris.query.filter_by(user_id=user_id).all()]
-    avis_user = Avis.query.filter_by(user_id=user_id).all()
-    avis_ids = [a.cours_id for a in avis_user]
+    interactions = charger_interactions(user_id)
     
     # Obtenir les préférences du profil utilisateur
     profil = Profils_Utilisateurs.query.filter_by(user_id=user_id).first()
@@ -794,47 +931,52 @@ def cours_recommandes(user_id):
     # Déterminer les cours à exclure des recommandations
     # MODIFICATION: Ne pas exclure les cours favoris des recommandations
     # pour que l'utilisateur puisse continuer à les voir même s'ils sont favoris
-    cours_exclus = set(historique_ids + avis_ids)  # On retire favoris_ids de cette liste
-    
-    query = db.session.query(
-        Cours,
-        func.coalesce(func.avg(Avis.note), 0).label("moyenne_note"),
-        (
-            0.3 * Cours.nombre_vues +
-            0.3 * func.coalesce(func.avg(Avis.note), 0) * 20 +
-            0.2 * func.count(Favoris.id_favoris) +
-            0.2 * func.count(Historique_Consultation.id_historique)
-        ).label("score")
-    ).outerjoin(Avis, Cours.id_cours == Avis.cours_id
-    ).outerjoin(Favoris, Cours.id_cours == Favoris.cours_id
-    ).outerjoin(Historique_Consultation, Cours.id_cours == Historique_Consultation.cours_id)
+    cours_exclus = np.union1d(interactions.historique, interactions.avis)  # On retire les favoris de cette liste
+
+    # Liste précalculée du segment : suffisante si elle contient tout le segment
+    # ou s'il reste au moins 50 cours après exclusion (toujours le cas d'un nouvel utilisateur)
+    segment = liste_segment(domaine_pref, objectif_pref)
+    restants = [c for c in segment if not contient(cours_exclus, c["id_cours"])]
+    if len(restants) >= 50 or len(segment) < app.config['RECO_SEGMENTS_TAILLE']:
+        return restants[:50]
+
+    query = requete_populaires()
     
     if domaine_pref:
         query = query.filter(Cours.domaine == domaine_pref)
     if objectif_pref:
         query = query.filter(Cours.objectifs == objectif_pref)
-    if cours_exclus:
-        query = query.filter(~Cours.id_cours.in_(cours_exclus))
+    if len(cours_exclus):
+        query = query.filter(~Cours.id_cours.in_(cours_exclus.tolist()))
         
-    result = query.group_by(Cours.id_cours).order_by(desc('score')).limit(50).all()
+    result = query.order_by(desc('score')).limit(50).all()
     
     # Retourner une liste de tuples (cours, moyenne_note, score)
-    return [{
-        "id_cours": cours.id_cours,
-        "nom": cours.nom,
-        "domaine": cours.domaine,
-        "type_ressource": cours.type_ressource,
-        "niveau": cours.niveau,
-        "langue": cours.langue,
-        "objectifs": cours.objectifs,
-        "chemin_source": cours.chemin_source,
-        "nombre_vues": cours.nombre_vues,
-        "moyenne_note": float(moyenne_note),
-        "score": float(score)
-    } for cours, moyenne_note, score in result]
+    return [cours_json(cours, moyenne_note, score) for cours, moyenne_note, score in result]
 
 
 
+def recommandations_materialisees(user_id, stratégie='populaire'):
+    """Lit les recommandations précalculées par rafraichir_recommandations.py (liste vide si aucune)."""
+    rows = db.session.query(Recommandations, Cours).join(
+        Cours, Cours.id_cours == Recommandations.cours_id
+    ).filter(
+        Recommandations.user_id == user_id, Recommandations.stratégie == stratégie
+    ).order_by(Recommandations.rang).all()
+    if not rows:
+        return []
+
+    # Les cours vus ou notés depuis le dernier calcul sont retirés, comme dans cours_recommandes
+    interactions = charger_interactions(user_id)
+    cours_exclus = np.union1d(interactions.historique, interactions.avis)
+
+    return [{
+        **dict_cours(cours),
+        "moyenne_note": reco.moyenne_note or 0.0,
+        "score": reco.score or 0.0
+    } for reco, cours in rows if not contient(cours_exclus, cours.id_cours)]
+
+
 @courses_bp.route('/api/dashboard', methods=['GET'])
 @login_required_route
 def dashboard():
@@ -912,41 +1054,36 @@ def admin_stats():
     }), 200
 
 
+@courses_bp.route('/api/admin/recommandations/temps', methods=['GET'])
+@login_required_route
+@admin_required
+def temps_recommandations():
+    """Latence récente (p50, p95, p99 en ms) de chaque branche des recommandations hybrides"""
+    return jsonify(statistiques_branches()), 200
+
+
 @courses_bp.route('/api/admin/top-courses', methods=['GET'])
 @login_required_route
 @admin_required
 def top_courses():
     """Récupère les 10 cours les plus consultés avec statistiques détaillées"""
     
-    # Import distinct si nécessaire
-    from sqlalchemy import distinct
-    
     top_courses = db.session.query(
         Cours,
-        func.coalesce(func.avg(Avis.note), 0).label('moyenne_note'),
-        func.count(distinct(Favoris.id_favoris)).label('nombre_favoris')
-    ).outerjoin(
-        Avis, Cours.id_cours == Avis.cours_id
+        func.coalesce(Cours_Stats.moyenne, 0).label('moyenne_note'),
+        func.coalesce(Cours_Stats.nombre_favoris, 0).label('nombre_favoris')
     ).outerjoin(
-        Favoris, Cours.id_cours == Favoris.cours_id
-    ).group_by(
-        Cours.id_cours
+        Cours_Stats, Cours.id_cours == Cours_Stats.cours_id
     ).order_by(
         desc(Cours.nombre_vues)
     ).limit(10).all()
     
-    result = [{
-        'id_cours': course.id_cours,
-        'nom': course.nom,
-        'domaine': course.domaine,
-        'type_ressource': course.type_ressource,
-        'niveau': course.niveau,
-        'nombre_vues': course.nombre_vues,
-        'moyenne_note': float(moyenne_note),
-        'nombre_favoris': nombre_favoris
-    } for course, moyenne_note, nombre_favoris in top_courses]
+    result = [
+        objet_cours(course, moyenne_note=float(moyenne_note), nombre_favoris=nombre_favoris)
+        for course, moyenne_note, nombre_favoris in top_courses
+    ]
     
-    return jsonify(result), 200
+    return reponse_json(result), 200
 
 
 @courses_bp.route('/api/admin/courses-activity', methods=['GET'])
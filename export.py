@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+
+from Models import app, db, Cours, Utilisateurs
+from security import login_required_route, admin_required
+from json_rapide import dumps_octets
+from flux import par_lots, flux_csv, flux_ndjson, reponse_flux
+
+export_bp = Blueprint('export', __name__)
+
+# Tables exportables : modèle et colonnes lues (jamais le mot de passe), dans l'ordre de l'identifiant.
+# Les colonnes sont lues en tuples, sans objets ORM ni cache de sérialisation : la mémoire reste
+# celle d'un lot, quelle que soit la taille de la table.
+EXPORTS = {
+    "cours": (Cours, ("id_cours", "nom", "domaine", "type_ressource", "niveau", "langue", "objectifs", "durée",
+                      "chemin_source", "nombre_vues")),
+    "users": (Utilisateurs, ("id_user", "nom", "prenom", "email", "rôle", "date_inscription")),
+}
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def _valeur(valeur):
+    return valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur
+
+
+@export_bp.route('/api/admin/export/<table>', methods=['GET'])
+@login_required_route
+@admin_required
+def exporter(table):
+    """Export complet d'une table (?format=csv par défaut, ou ndjson), envoyé au fil de l'eau."""
+    if table not in EXPORTS:
+        return jsonify({"error": f"Table inconnue. Choix possibles : {', '.join(EXPORTS)}"}), 404
+    format_export = request.args.get('format', 'csv')
+    if format_export not in FORMATS:
+        return jsonify({"error": f"Format inconnu. Choix possibles : {', '.join(FORMATS)}"}), 400
+
+    modele, colonnes = EXPORTS[table]
+    query = db.session.query(*[getattr(modele, colonne) for colonne in colonnes])
+    lignes = ([_valeur(v) for v in ligne] for ligne in par_lots(query, (getattr(modele, colonnes[0]),)))
+    if format_export == "csv":
+        morceaux = flux_csv(colonnes, lignes)
+    else:
+        morceaux = flux_ndjson(dumps_octets(app, dict(zip(colonnes, ligne))) for ligne in lignes)
+
+    mimetype, extension = FORMATS[format_export]
+    nom_fichier = f"{table}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+    return reponse_flux(morceaux, mimetype, nom_fichier), 200
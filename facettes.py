@@ -0,0 +1,198 @@
+import threading
+
+import numpy as np
+
+from Models import db, Cours
+from recommendations import CATEGORIES_COURS
+from versions import lire_versions, version_catalogue
+
+# Index bitmap du catalogue : pour chaque valeur de chaque facette, un entier Python dont le bit i
+# est à 1 si le cours en position i a cette valeur. Une combinaison de filtres se résout par ET
+# binaire entre facettes (OU entre valeurs d'une même facette), et un comptage par bit_count().
+# L'index est propre au processus : il note la version « catalogue » de sa construction et se
+# reconstruit quand elle a avancé (écriture admin traitée par un autre processus).
+FACETTES = tuple(CATEGORIES_COURS)
+
+
+def lire_selection(args):
+    """Valeurs demandées pour chaque facette ; un paramètre répété (?niveau=a&niveau=b) se lit comme un OU."""
+    selection = {}
+    for facette in FACETTES:
+        valeurs = [v for v in args.getlist(facette) if v]
+        if valeurs:
+            selection[facette] = valeurs
+    return selection
+
+
+class IndexFacettes:
+    """Bitsets par valeur de facette, construits depuis Cours puis tenus à jour à chaque écriture admin."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.construit = False
+        self.ids = []          # position -> id_cours (-1 : cours supprimé)
+        self.positions = {}    # id_cours -> position ; les positions suivent l'ordre des identifiants
+        self.valeurs = {}      # id_cours -> valeurs de ses facettes, pour effacer ses bits
+        self.bits = {}         # facette -> {valeur: bitset}
+        self.tous = 0
+        self.trous = 0
+        self.version = None    # version « catalogue » reflétée par l'index
+        self._ids_np = None
+
+    def construire(self):
+        self.ids, self.positions, self.valeurs = [], {}, {}
+        self.bits = {facette: {} for facette in FACETTES}
+        self.tous, self.trous, self._ids_np = 0, 0, None
+        colonnes = [getattr(Cours, facette) for facette in FACETTES]
+        for id_cours, *valeurs in db.session.query(Cours.id_cours, *colonnes).order_by(Cours.id_cours):
+            self._ajouter(id_cours, valeurs)
+        self.construit = True
+
+    def _ajouter(self, id_cours, valeurs):
+        position = len(self.ids)
+        self.ids.append(id_cours)
+        self.positions[id_cours] = position
+        self._poser(id_cours, position, valeurs)
+
+    def _poser(self, id_cours, position, valeurs):
+        bit = 1 << position
+        for facette, valeur in zip(FACETTES, valeurs):
+            self.bits[facette][valeur] = self.bits[facette].get(valeur, 0) | bit
+        self.valeurs[id_cours] = tuple(valeurs)
+        self.tous |= bit
+
+    def _effacer(self, id_cours, position):
+        masque = ~(1 << position)
+        for facette, valeur in zip(FACETTES, self.valeurs.pop(id_cours)):
+            self.bits[facette][valeur] &= masque
+        self.tous &= masque
+
+    def _pret(self):
+        # À appeler sous le verrou ; catalogue modifié ailleurs, ou trop de positions libérées par des
+        # suppressions (compactage) : reconstruction
+        version = version_catalogue()
+        if not self.construit or self.version != version or self.trous > max(len(self.ids) // 2, 64):
+            self.construire()
+            self.version = version
+
+    def _suivre_version(self):
+        # Après une écriture admin commitée dans ce processus : si elle est la seule depuis la
+        # construction, l'index mis à jour correspond à la nouvelle version ; sinon reconstruction
+        version = lire_versions("catalogue")[0]
+        self.version = version if self.version is not None and version == self.version + 1 else None
+
+    def maj_cours(self, cours):
+        valeurs = [getattr(cours, facette) for facette in FACETTES]
+        with self.lock:
+            if not self.construit:
+                return  # l'index sera construit au premier usage, avec ce cours
+            position = self.positions.get(cours.id_cours)
+            if position is not None:
+                self._effacer(cours.id_cours, position)
+                self._poser(cours.id_cours, position, valeurs)
+            elif self.ids and cours.id_cours < self.ids[-1]:
+                self.construit = False  # identifiant hors ordre : reconstruction au prochain usage
+            else:
+                self._ajouter(cours.id_cours, valeurs)
+                self._ids_np = None
+            self._suivre_version()
+
+    def retirer_cours(self, id_cours):
+        with self.lock:
+            position = self.positions.pop(id_cours, None) if self.construit else None
+            if position is None:
+                return
+            self._effacer(id_cours, position)
+            self.ids[position] = -1
+            self.trous += 1
+            self._ids_np = None
+            self._suivre_version()
+
+    def _masque(self, selection, sauf=None):
+        masque = self.tous
+        for facette, valeurs in selection.items():
+            if facette != sauf:
+                union = 0
+                for valeur in valeurs:
+                    union |= self.bits[facette].get(valeur, 0)
+                masque &= union
+        return masque
+
+    def _ids_tableau(self):
+        if self._ids_np is None:
+            self._ids_np = np.array(self.ids, dtype=np.int64)
+        return self._ids_np
+
+    def bits_ids(self, ids):
+        """Bitset des cours d'une liste d'identifiants (ex : résultats d'une recherche plein texte)."""
+        with self.lock:
+            self._pret()
+            presents = np.zeros(len(self.ids) + 1, dtype=bool)
+            positions = [self.positions[i] for i in ids if i in self.positions]
+            presents[positions] = True
+            return int.from_bytes(np.packbits(presents, bitorder="little").tobytes(), "little")
+
+    def resoudre(self, selection, restriction=None):
+        """Identifiants triés des cours correspondant à la sélection."""
+        with self.lock:
+            self._pret()
+            masque = self._masque(selection)
+            if restriction is not None:
+                masque &= restriction
+            n = len(self.ids)
+            octets = np.frombuffer(masque.to_bytes((n + 7) // 8 or 1, "little"), dtype=np.uint8)
+            positions = np.flatnonzero(np.unpackbits(octets, bitorder="little")[:n])
+            return self._ids_tableau()[positions]
+
+    def compter(self, selection, restriction=None):
+        """Total de la sélection et, pour chaque valeur de chaque facette, le nombre de cours si on la choisissait.
+
+        Le comptage d'une facette ignore son propre filtre : on voit les autres valeurs disponibles.
+        """
+        with self.lock:
+            self._pret()
+            base = self.tous if restriction is None else self.tous & restriction
+            total = (self._masque(selection) & base).bit_count()
+            facettes = {}
+            for facette in FACETTES:
+                autres = self._masque(selection, sauf=facette) & base
+                facettes[facette] = {
+                    valeur: (self.bits[facette].get(valeur, 0) & autres).bit_count()
+                    for valeur in CATEGORIES_COURS[facette]
+                }
+            return {"total": total, "facettes": facettes}
+
+
+_index = IndexFacettes()
+
+
+def maj_cours_facettes(cours):
+    """À appeler après l'ajout ou la modification d'un cours (après le commit)."""
+    _index.maj_cours(cours)
+
+
+def retirer_cours_facettes(id_cours):
+    """À appeler après la suppression d'un cours."""
+    _index.retirer_cours(id_cours)
+
+
+def ids_selection(selection, restriction=None):
+    return _index.resoudre(selection, restriction)
+
+
+def compter_facettes(selection, restriction=None):
+    return _index.compter(selection, restriction)
+
+
+def bits_ids(ids):
+    return _index.bits_ids(ids)
+
+
+def charger_cours(ids, taille_lot=500):
+    """Cours d'une liste d'identifiants, dans le même ordre (par lots, sous la limite de paramètres SQL)."""
+    ids = [int(i) for i in ids]
+    cours_map = {}
+    for debut in range(0, len(ids), taille_lot):
+        lot = ids[debut:debut + taille_lot]
+        cours_map.update((c.id_cours, c) for c in Cours.query.filter(Cours.id_cours.in_(lot)))
+    return [cours_map[i] for i in ids if i in cours_map]
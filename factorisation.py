@@ -0,0 +1,85 @@
+"""Entraînement hors ligne de la factorisation matricielle implicite (ALS) sur les interactions.
+
+Exemple : python factorisation.py --facteurs 32 --iterations 10
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+
+from Models import app, db, Avis, Favoris, Historique_Consultation
+from artefacts import publier
+
+# Poids de chaque signal implicite ; pour les avis, le poids est multiplié par la note
+POIDS_IMPLICITES = {"historique": 1.0, "favoris": 4.0, "avis": 1.0}
+
+
+def matrice_implicite():
+    """Matrice utilisateurs × cours des signaux pondérés, avec les identifiants de lignes et de colonnes."""
+    rows = (
+        [(u, c, POIDS_IMPLICITES["historique"]) for u, c in db.session.query(Historique_Consultation.user_id, Historique_Consultation.cours_id)]
+        + [(u, c, POIDS_IMPLICITES["favoris"]) for u, c in db.session.query(Favoris.user_id, Favoris.cours_id)]
+        + [(u, c, POIDS_IMPLICITES["avis"] * n) for u, c, n in db.session.query(Avis.user_id, Avis.cours_id, Avis.note)]
+    )
+    if not rows:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.zeros(0, dtype=str), np.zeros(0, dtype=np.int64)
+
+    users, cours, poids = zip(*rows)
+    user_ids, lignes = np.unique(np.array(users, dtype=str), return_inverse=True)
+    cours_ids, colonnes = np.unique(np.array(cours, dtype=np.int64), return_inverse=True)
+    matrice = sparse.csr_matrix(
+        (np.array(poids, dtype=np.float32), (lignes, colonnes)), shape=(len(user_ids), len(cours_ids))
+    )
+    matrice.sort_indices()
+    return matrice, user_ids, cours_ids
+
+
+def _demi_etape(confiance, fixes, regularisation):
+    # Résout, pour chaque ligne u : (YᵀY + Yᵀ(Cu − I)Y + λI) x_u = Yᵀ Cu p_u
+    n_facteurs = fixes.shape[1]
+    YtY = fixes.T @ fixes + regularisation * np.eye(n_facteurs)
+    resultat = np.zeros((confiance.shape[0], n_facteurs), dtype=np.float32)
+    for u in range(confiance.shape[0]):
+        debut, fin = confiance.indptr[u], confiance.indptr[u + 1]
+        if debut == fin:
+            continue
+        Y = fixes[confiance.indices[debut:fin]]
+        c = confiance.data[debut:fin]
+        A = YtY + (Y.T * c) @ Y
+        b = Y.T @ (1.0 + c)
+        resultat[u] = np.linalg.solve(A, b)
+    return resultat
+
+
+def entrainer_als(matrice, facteurs=32, regularisation=0.1, alpha=40.0, iterations=10, graine=0):
+    """ALS pour retours implicites (Hu, Koren & Volinsky) : retourne les facteurs utilisateurs et cours."""
+    rng = np.random.default_rng(graine)
+    confiance = (matrice * alpha).tocsr()
+    confiance_t = confiance.T.tocsr()
+    X = rng.normal(scale=0.01, size=(matrice.shape[0], facteurs)).astype(np.float32)
+    Y = rng.normal(scale=0.01, size=(matrice.shape[1], facteurs)).astype(np.float32)
+    for _ in range(iterations):
+        X = _demi_etape(confiance, Y, regularisation)
+        Y = _demi_etape(confiance_t, X, regularisation)
+    return X, Y
+
+
+def enregistrer_als(user_ids, cours_ids, facteurs_users, facteurs_cours):
+    return publier("als", {"user_ids": user_ids, "cours_ids": cours_ids, "users": facteurs_users, "cours": facteurs_cours})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facteurs", type=int, default=32)
+    parser.add_argument("--regularisation", type=float, default=0.1)
+    parser.add_argument("--alpha", type=float, default=40.0)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    with app.app_context():
+        debut = time.perf_counter()
+        matrice, user_ids, cours_ids = matrice_implicite()
+        X, Y = entrainer_als(matrice, args.facteurs, args.regularisation, args.alpha, args.iterations)
+        chemin = enregistrer_als(user_ids, cours_ids, X, Y)
+        print(f"📌 {len(user_ids)} utilisateurs × {len(cours_ids)} cours entraînés en {time.perf_counter() - debut:.1f}s → {chemin}")
@@ -0,0 +1,88 @@
+import csv
+import io
+
+from flask import stream_with_context
+
+from Models import app
+from pagination import lire_page
+
+# Réponses produites au fil de l'eau : les lignes sont lues par lots et encodées une à une, regroupées
+# en morceaux de taille fixe ; la mémoire du processus ne dépend pas du nombre de lignes et le premier
+# octet part dès le premier lot lu. Chaque lot est une courte requête par clé (comme la pagination) :
+# aucun curseur ne reste ouvert pendant l'envoi, donc aucun verrou SQLite ne bloque les écritures
+# tant que le client télécharge.
+app.config.setdefault('FLUX_TAILLE_LOT', 1000)        # lignes lues par requête
+app.config.setdefault('FLUX_TAILLE_MORCEAU', 65536)   # octets envoyés par écriture
+
+
+def par_lots(query, tri):
+    """Itère sur une requête ORM triée sur les colonnes tri (identifiant en dernier), lot par lot."""
+    apres = None
+    while True:
+        lignes, apres = lire_page(query, tri, app.config['FLUX_TAILLE_LOT'], apres)
+        yield from lignes
+        if apres is None:
+            return
+
+
+def _regrouper(morceaux):
+    # Évite une écriture réseau par ligne
+    taille_max = app.config['FLUX_TAILLE_MORCEAU']
+    tampon, taille = [], 0
+    for morceau in morceaux:
+        tampon.append(morceau)
+        taille += len(morceau)
+        if taille >= taille_max:
+            yield b"".join(tampon)
+            tampon, taille = [], 0
+    if tampon:
+        yield b"".join(tampon)
+
+
+def flux_tableau_json(objets):
+    """Tableau JSON à partir d'objets déjà encodés (octets), sans les garder en mémoire."""
+    yield b"["
+    separateur = b""
+    for objet in objets:
+        yield separateur + objet
+        separateur = b","
+    yield b"]"
+
+
+def flux_ndjson(objets):
+    """Un objet JSON encodé par ligne."""
+    for objet in objets:
+        yield objet + b"\n"
+
+
+# Début de cellule interprété comme une formule par les tableurs (injection CSV)
+_DEBUTS_FORMULE = ("=", "+", "-", "@", "\t", "\r")
+
+
+def cellule_csv(valeur):
+    """Texte commençant comme une formule préfixé d'une apostrophe : le tableur l'affiche tel quel."""
+    if isinstance(valeur, str) and valeur.startswith(_DEBUTS_FORMULE):
+        return "'" + valeur
+    return valeur
+
+
+def flux_csv(colonnes, lignes):
+    """CSV UTF-8 (avec BOM, pour que les tableurs lisent les accents) : en-tête puis une ligne par tuple."""
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    tampon.write("\ufeff")
+    ecrivain.writerow(colonnes)
+    for ligne in lignes:
+        ecrivain.writerow([cellule_csv(valeur) for valeur in ligne])
+        yield tampon.getvalue().encode("utf-8")
+        tampon.seek(0)
+        tampon.truncate()
+    yield tampon.getvalue().encode("utf-8")
+
+
+def reponse_flux(morceaux, mimetype="application/json", nom_fichier=None):
+    """Réponse streamée ; le contexte de requête (et la session SQLAlchemy) reste ouvert pendant l'envoi."""
+    reponse = app.response_class(stream_with_context(_regrouper(morceaux)), mimetype=mimetype)
+    if nom_fichier:
+        reponse.headers["Content-Disposition"] = f'attachment; filename="{nom_fichier}"'
+    return reponse
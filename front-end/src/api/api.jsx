@@ -100,10 +100,10 @@ export const getDashboardData = async (params = {}) => {
 
 export const searchCours = async (params = {}) => {
   try {
-    // Ajout d'un timestamp pour éviter la mise en cache du navigateur ou des CDN
-    const timestamp = Date.now();
+    // Le serveur répond avec un ETag et Cache-Control: no-cache : le navigateur revalide
+    // chaque appel et reçoit un 304 sans corps si le catalogue n'a pas changé
     const response = await axios.get(`${API_URL}/api/cours`, {
-      params: { ...params, _t: timestamp },
+      params,
       withCredentials: true,
     });
     return response.data;
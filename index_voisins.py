@@ -0,0 +1,217 @@
+import threading
+
+import numpy as np
+
+
+# Index de plus proches voisins (similarité cosinus) sur les lignes d'une matrice creuse.
+# Chaque index expose la même interface : construire(matrice), inserer(i, ligne), voisins(matrice, i, k).
+
+
+def _similarites(matrice, lignes, vecteur):
+    # Similarité cosinus entre un vecteur (1 × d) et un sous-ensemble de lignes de la matrice
+    candidats = matrice[lignes]
+    produits = np.asarray((candidats @ vecteur.T).todense()).ravel()
+    normes = np.sqrt(np.asarray(candidats.multiply(candidats).sum(axis=1)).ravel()) * np.sqrt(vecteur.multiply(vecteur).sum())
+    return np.divide(produits, normes, out=np.zeros_like(produits, dtype=np.float64), where=normes > 0)
+
+
+class IndexExact:
+    """Recherche exhaustive sur tous les utilisateurs (référence pour mesurer le rappel)."""
+
+    def construire(self, matrice):
+        pass
+
+    def inserer(self, i, ligne):
+        pass
+
+    def voisins(self, matrice, i, k):
+        similarites = _similarites(matrice, np.arange(matrice.shape[0]), matrice[i])
+        similarites[i] = -np.inf
+        return np.argsort(-similarites, kind="stable")[:min(k, matrice.shape[0] - 1)]
+
+
+class IndexLSH:
+    """Hachage par hyperplans aléatoires (NumPy uniquement), avec insertions incrémentales.
+
+    Chaque table range les lignes selon le signe de leurs projections sur n_bits hyperplans ;
+    les candidats des seaux de l'utilisateur sont ensuite reclassés avec la similarité exacte.
+    Sans n_bits, il est déduit du nombre de lignes à chaque construction (seaux d'environ
+    taille_seau lignes) ; au-delà de max_candidats, seuls les candidats rencontrés dans le plus
+    de seaux sont reclassés.
+    """
+
+    def __init__(self, n_bits=None, n_tables=16, sondes=1, taille_seau=16, max_candidats=2000, seuil_exact=5000,
+                 graine=42):
+        self.n_bits_fixe = n_bits
+        self.n_tables = n_tables
+        self.sondes = sondes  # 1 : on visite aussi les seaux à un bit de distance
+        self.taille_seau = taille_seau
+        self.max_candidats = max_candidats
+        self.seuil_exact = seuil_exact
+        self.rng = np.random.default_rng(graine)
+        self._dimensionner(n_bits or 1)
+        self.cles = np.zeros((0, n_tables), dtype=np.int64)
+        self.tries = []       # par table : (clés triées, lignes correspondantes)
+        self.recents = []     # par table : {clé: set(lignes)} insérées depuis la dernière construction
+        self.n_recents = 0
+        # Les recommandations hybrides interrogent l'index depuis plusieurs threads
+        self.lock = threading.RLock()
+
+    def _dimensionner(self, n_bits):
+        # Nouveau nombre de bits : nouveaux hyperplans (les clés sont toutes recalculées par construire)
+        self.n_bits = n_bits
+        self.poids_bits = (1 << np.arange(n_bits)).astype(np.int64)
+        self.projections = np.zeros((0, self.n_tables * n_bits), dtype=np.float32)
+
+    def _projections(self, d):
+        # Les hyperplans sont étendus au fil de l'ajout de nouveaux cours (nouvelles colonnes)
+        if d > self.projections.shape[0]:
+            ajout = self.rng.standard_normal((d - self.projections.shape[0], self.projections.shape[1]), dtype=np.float32)
+            self.projections = np.vstack([self.projections, ajout])
+        return self.projections[:d]
+
+    def _hacher(self, lignes):
+        bits = np.asarray(lignes @ self._projections(lignes.shape[1])) >= 0
+        return (bits.reshape(-1, self.n_tables, self.n_bits) * self.poids_bits).sum(axis=2)
+
+    def construire(self, matrice):
+        with self.lock:
+            n_bits = self.n_bits_fixe or max(1, round(np.log2(max(matrice.shape[0], 1) / self.taille_seau)))
+            if n_bits != self.n_bits:
+                self._dimensionner(n_bits)
+            self.cles = self._hacher(matrice) if matrice.shape[0] else np.zeros((0, self.n_tables), dtype=np.int64)
+            self.tries = []
+            for t in range(self.n_tables):
+                ordre = np.argsort(self.cles[:, t], kind="stable")
+                self.tries.append((self.cles[ordre, t], ordre))
+            self.recents = [{} for _ in range(self.n_tables)]
+            self.n_recents = 0
+
+    def inserer(self, i, ligne):
+        with self.lock:
+            cles = self._hacher(ligne)[0]
+            if i >= len(self.cles):
+                self.cles = np.vstack([self.cles, np.zeros((i + 1 - len(self.cles), self.n_tables), dtype=np.int64)])
+            self.cles[i] = cles
+            for t in range(self.n_tables):
+                self.recents[t].setdefault(int(cles[t]), set()).add(i)
+            self.n_recents += 1
+
+    def _candidats(self, i):
+        cles_i = self.cles[i]
+        candidats = []
+        for t in range(self.n_tables):
+            sondes = [int(cles_i[t])]
+            if self.sondes:
+                sondes += [int(cles_i[t]) ^ (1 << b) for b in range(self.n_bits)]
+            cles_triees, lignes = self.tries[t]
+            for cle in sondes:
+                debut, fin = np.searchsorted(cles_triees, [cle, cle + 1])
+                candidats.append(lignes[debut:fin])
+                candidats.append(np.fromiter(self.recents[t].get(cle, ()), dtype=np.int64))
+        # Une ligne réinsérée peut encore figurer dans son ancien seau : sans conséquence,
+        # les candidats sont de toute façon reclassés avec la similarité exacte
+        candidats, collisions = np.unique(np.concatenate(candidats), return_counts=True)
+        garder = candidats != i
+        candidats, collisions = candidats[garder], collisions[garder]
+        if self.max_candidats and len(candidats) > self.max_candidats:
+            candidats = np.sort(candidats[np.argpartition(-collisions, self.max_candidats - 1)[:self.max_candidats]])
+        return candidats
+
+    def voisins(self, matrice, i, k):
+        k = min(k, matrice.shape[0] - 1)
+        if matrice.shape[0] <= self.seuil_exact or i >= len(self.cles):
+            return IndexExact().voisins(matrice, i, k)
+
+        with self.lock:
+            # Trop d'insertions depuis la dernière construction : on reconstruit les tables triées
+            if self.n_recents > 0.1 * matrice.shape[0]:
+                self.construire(matrice)
+            candidats = self._candidats(i)
+        if len(candidats) < k:
+            return IndexExact().voisins(matrice, i, k)
+        similarites = _similarites(matrice, candidats, matrice[i])
+        meilleurs = np.argpartition(-similarites, k - 1)[:k] if len(candidats) > k else np.arange(len(candidats))
+        return candidats[meilleurs[np.argsort(-similarites[meilleurs], kind="stable")]]
+
+
+class IndexInverse:
+    """Listes inversées cours → utilisateurs (NumPy uniquement), avec insertions incrémentales.
+
+    Seuls les utilisateurs ayant noté un cours en commun ont une similarité non nulle : les produits
+    scalaires sont accumulés sur les listes des cours de l'utilisateur, et le résultat est celui de la
+    recherche exacte. Le coût suit le nombre de notes de ces cours, non le nombre d'utilisateurs.
+    Les lignes insérées depuis la dernière construction sont comparées directement sur la matrice
+    à jour, jusqu'à max_modifiees lignes avant reconstruction.
+    Rappel et latence mesurés : voir benchmarks/rappel_voisins.py.
+    """
+
+    def __init__(self, max_modifiees=5000):
+        self.max_modifiees = max_modifiees
+        self.colonnes = None       # matrice au format CSC lors de la dernière construction
+        self.normes = np.zeros(0)
+        self.modifiees = set()
+        self.lock = threading.RLock()
+
+    def construire(self, matrice):
+        with self.lock:
+            self.colonnes = matrice.tocsc()
+            self.normes = np.sqrt(np.asarray(matrice.multiply(matrice).sum(axis=1)).ravel())
+            self.modifiees = set()
+
+    def inserer(self, i, ligne):
+        with self.lock:
+            self.modifiees.add(i)
+
+    def voisins(self, matrice, i, k):
+        k = min(k, matrice.shape[0] - 1)
+        with self.lock:
+            if self.colonnes is None or len(self.modifiees) > self.max_modifiees:
+                self.construire(matrice)
+            colonnes, normes = self.colonnes, self.normes
+            modifiees = np.fromiter(self.modifiees, dtype=np.int64, count=len(self.modifiees))
+
+        # Notes des autres utilisateurs sur les cours de la ligne i, lues bout à bout dans les colonnes
+        debut, fin = matrice.indptr[i], matrice.indptr[i + 1]
+        cours, notes = matrice.indices[debut:fin], matrice.data[debut:fin]
+        connus = cours < colonnes.shape[1]  # cours apparus depuis la construction : lignes modifiées
+        cours, notes = cours[connus], notes[connus]
+        bornes = colonnes.indptr
+        longueurs = bornes[cours + 1] - bornes[cours]
+        positions = np.repeat(bornes[cours] - np.cumsum(longueurs) + longueurs, longueurs) + np.arange(longueurs.sum())
+        candidats, inverse = np.unique(colonnes.indices[positions], return_inverse=True)
+        produits = np.bincount(inverse, weights=colonnes.data[positions] * np.repeat(notes, longueurs),
+                               minlength=len(candidats))
+
+        garder = candidats != i
+        if len(modifiees):
+            garder &= ~np.isin(candidats, modifiees)
+        candidats, produits = candidats[garder], produits[garder]
+        normes_candidats = normes[candidats] * np.sqrt(np.square(matrice.data[debut:fin], dtype=np.float64).sum())
+        similarites = np.divide(produits, normes_candidats, out=np.zeros(len(candidats)), where=normes_candidats > 0)
+
+        # Les lignes modifiées ont des notes périmées dans les colonnes : similarité exacte sur la matrice
+        modifiees = modifiees[modifiees != i]
+        if len(modifiees):
+            candidats = np.concatenate([candidats, modifiees])
+            similarites = np.concatenate([similarites, _similarites(matrice, modifiees, matrice[i])])
+
+        garder = similarites > 0
+        candidats, similarites = candidats[garder], similarites[garder]
+        if len(candidats) < k:
+            # Comme la recherche exacte : complété par les premières lignes de similarité nulle
+            nuls = np.setdiff1d(np.arange(min(matrice.shape[0], k + len(candidats) + 1)), np.append(candidats, i))
+            ordre = candidats[np.argsort(-similarites, kind="stable")]
+            return np.concatenate([ordre, nuls[:k - len(candidats)]])
+        meilleurs = np.argpartition(-similarites, k - 1)[:k] if len(candidats) > k else np.arange(len(candidats))
+        return candidats[meilleurs[np.argsort(-similarites[meilleurs], kind="stable")]]
+
+
+INDEX_VOISINS = {"exact": IndexExact, "lsh": IndexLSH, "inverse": IndexInverse}
+
+
+def creer_index(nom, params=None):
+    """Instancie l'index de voisins configuré ; params associe à chaque nom d'index ses arguments."""
+    if nom not in INDEX_VOISINS:
+        raise ValueError(f"Index de voisins inconnu : {nom} (choix possibles : {', '.join(INDEX_VOISINS)})")
+    return INDEX_VOISINS[nom](**(params or {}).get(nom, {}))
@@ -1,78 +1,238 @@
 import sqlite3
+import sys
 
-conn = sqlite3.connect('recommandation.db')
-c = conn.cursor()
-
-# Activer les clés étrangères
-c.execute("PRAGMA foreign_keys = ON")
-
-# Table Utilisateurs
-c.execute('''
-    CREATE TABLE IF NOT EXISTS Utilisateurs (
-        id_user TEXT PRIMARY KEY,
-        Nom TEXT NOT NULL,
-        Prenom TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        mot_de_passe TEXT NOT NULL,
-        date_inscription TEXT DEFAULT CURRENT_TIMESTAMP,
-        rôle TEXT CHECK (rôle IN ('admin', 'user')) NOT NULL
-    )
-''')
-
-# Table Cours
-c.execute('''
-    CREATE TABLE IF NOT EXISTS Cours (
-    id_cours INTEGER PRIMARY KEY AUTOINCREMENT,
-    nom TEXT NOT NULL,
-    type_ressource TEXT NOT NULL CHECK (type_ressource IN ('Tutoriel', 'Cours', 'Livre', 'TD')),
-    domaine TEXT NOT NULL CHECK (domaine IN ('Informatique', 'Mathématiques', 'Physique', 'Chimie', 'Langues')),
-    langue TEXT NOT NULL CHECK (langue IN ('Français', 'Anglais', 'Arabe')),
-    niveau TEXT NOT NULL CHECK (niveau IN ('Débutant', 'Intermédiaire', 'Avancé')),
-    objectifs TEXT NOT NULL CHECK (objectifs IN ('Révision', 'Préparation examen', 'Apprentissage','Approfondissement')),
-    durée INTEGER,
-    chemin_source TEXT NOT NULL,
-    nombre_vues INTEGER DEFAULT 0 CHECK (nombre_vues >= 0)
-    )
-''')
-
-# Table Profils_Utilisateurs
-c.execute('''
-    CREATE TABLE IF NOT EXISTS Profils_Utilisateurs (
-        id_profil INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id TEXT NOT NULL,
-        domaine_intérêt TEXT NOT NULL CHECK (domaine_intérêt IN ('Informatique', 'Mathématiques', 'Physique', 'Langues')),
-        objectifs TEXT CHECK (objectifs IN ('Révision', 'Préparation examen', 'Apprentissage','Approfondissement')),
-        date_mise_à_jour TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE
-    )
-''')
-
-
-# Table Avis
-c.execute('''
-    CREATE TABLE IF NOT EXISTS Avis (
-        id_avis INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        cours_id INTEGER NOT NULL,
-        note INTEGER CHECK (note BETWEEN 1 AND 5),
-        commentaire TEXT,
-        date TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
-        FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
-    )
-''')
-
-# Table Favoris
-c.execute('''
-    CREATE TABLE IF NOT EXISTS Favoris (
-        id_favoris INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        cours_id INTEGER NOT NULL,
-        date_ajout TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
-        FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
-    )
-''')
-
-conn.commit()
-conn.close()
\ No newline at end of file
+from texte import normaliser
+
+
+def initialiser(chemin):
+    """Crée les tables manquantes et met à niveau le schéma d'une base SQLite (sans effet si elle est à jour).
+
+    Appelée par l'application au démarrage, ou à la main : python init_db.py instance/recommandation.db
+    """
+    conn = sqlite3.connect(chemin)
+    c = conn.cursor()
+
+    # Activer les clés étrangères
+    c.execute("PRAGMA foreign_keys = ON")
+
+    # Table Utilisateurs
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Utilisateurs (
+            id_user TEXT PRIMARY KEY,
+            Nom TEXT NOT NULL,
+            Prenom TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            mot_de_passe TEXT NOT NULL,
+            date_inscription TEXT DEFAULT CURRENT_TIMESTAMP,
+            rôle TEXT CHECK (rôle IN ('admin', 'user')) NOT NULL
+        )
+    ''')
+
+    # Table Cours
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Cours (
+        id_cours INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT NOT NULL,
+        type_ressource TEXT NOT NULL CHECK (type_ressource IN ('Tutoriel', 'Cours', 'Livre', 'TD')),
+        domaine TEXT NOT NULL CHECK (domaine IN ('Informatique', 'Mathématiques', 'Physique', 'Chimie', 'Langues')),
+        langue TEXT NOT NULL CHECK (langue IN ('Français', 'Anglais', 'Arabe')),
+        niveau TEXT NOT NULL CHECK (niveau IN ('Débutant', 'Intermédiaire', 'Avancé')),
+        objectifs TEXT NOT NULL CHECK (objectifs IN ('Révision', 'Préparation examen', 'Apprentissage','Approfondissement')),
+        durée INTEGER,
+        chemin_source TEXT NOT NULL,
+        nombre_vues INTEGER DEFAULT 0 CHECK (nombre_vues >= 0),
+        nom_normalise TEXT
+        )
+    ''')
+
+    # Nom sans accents ni majuscules (autocomplétion) : colonne ajoutée aux bases créées avant elle,
+    # puis remplie avec la même fonction Python que l'application, enregistrée sur la connexion
+    if "nom_normalise" not in [colonne[1] for colonne in c.execute("PRAGMA table_info(Cours)")]:
+        c.execute("ALTER TABLE Cours ADD COLUMN nom_normalise TEXT")
+    conn.create_function("normaliser", 1, normaliser, deterministic=True)
+    c.execute("UPDATE Cours SET nom_normalise = normaliser(nom) WHERE nom_normalise IS NOT normaliser(nom)")
+    c.execute("CREATE INDEX IF NOT EXISTS ix_Cours_nom_normalise ON Cours (nom_normalise)")
+
+    # Table Profils_Utilisateurs
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Profils_Utilisateurs (
+            id_profil INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            domaine_intérêt TEXT NOT NULL CHECK (domaine_intérêt IN ('Informatique', 'Mathématiques', 'Physique', 'Langues')),
+            objectifs TEXT CHECK (objectifs IN ('Révision', 'Préparation examen', 'Apprentissage','Approfondissement')),
+            date_mise_à_jour TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE
+        )
+    ''')
+
+
+    # Table Avis
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Avis (
+            id_avis INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            cours_id INTEGER NOT NULL,
+            note INTEGER CHECK (note BETWEEN 1 AND 5),
+            commentaire TEXT,
+            date TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
+            FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
+        )
+    ''')
+
+    # Table Favoris
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Favoris (
+            id_favoris INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            cours_id INTEGER NOT NULL,
+            date_ajout TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
+            FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
+        )
+    ''')
+
+    # Table Historique_Consultation (une ligne par utilisateur, cours et jour)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Historique_Consultation (
+            id_historique INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            cours_id INTEGER NOT NULL,
+            date_consultation DATE DEFAULT (CURRENT_DATE),
+            heure_consultation TEXT DEFAULT current_timestamp,
+            FOREIGN KEY(user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
+            FOREIGN KEY(cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE,
+            CONSTRAINT unique_user_cours UNIQUE(user_id, cours_id, date_consultation)
+        )
+    ''')
+
+    # Table Recommandations (recommandations précalculées par rafraichir_recommandations.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Recommandations (
+            id_recommandation INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            cours_id INTEGER NOT NULL,
+            stratégie TEXT NOT NULL CHECK (stratégie IN ('populaire', 'hybride')),
+            rang INTEGER NOT NULL,
+            score REAL,
+            moyenne_note REAL,
+            date_calcul TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
+            FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS ix_Recommandations_user_id ON Recommandations (user_id)")
+
+    # Table Recommandations_Etat (empreinte des données de chaque utilisateur au dernier calcul, par stratégie)
+    # Ancienne forme sans stratégie : simple état de calcul, supprimé (le prochain passage recalcule tout)
+    colonnes_etat = [colonne[1] for colonne in c.execute("PRAGMA table_info(Recommandations_Etat)")]
+    if colonnes_etat and "stratégie" not in colonnes_etat:
+        c.execute("DROP TABLE Recommandations_Etat")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Recommandations_Etat (
+            user_id TEXT NOT NULL,
+            stratégie TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            date_calcul TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, stratégie),
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE
+        )
+    ''')
+
+    # Table Cours_Stats (agrégats par cours, tenus à jour par l'application)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Cours_Stats (
+            cours_id INTEGER PRIMARY KEY,
+            somme_notes INTEGER NOT NULL DEFAULT 0,
+            nombre_avis INTEGER NOT NULL DEFAULT 0,
+            moyenne REAL NOT NULL DEFAULT 0,
+            nombre_favoris INTEGER NOT NULL DEFAULT 0,
+            nombre_consultations INTEGER NOT NULL DEFAULT 0,
+            derniere_activite TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
+        )
+    ''')
+
+    # Remplissage initial : chaque table est agrégée séparément avant la jointure (une ligne par cours)
+    c.execute('''
+        INSERT OR IGNORE INTO Cours_Stats (cours_id, somme_notes, nombre_avis, moyenne, nombre_favoris,
+                                           nombre_consultations, derniere_activite)
+        SELECT c.id_cours,
+               COALESCE(a.somme, 0),
+               COALESCE(a.n, 0),
+               COALESCE(a.somme * 1.0 / a.n, 0),
+               COALESCE(f.n, 0),
+               COALESCE(h.n, 0),
+               NULLIF(MAX(COALESCE(a.derniere, ''), COALESCE(f.derniere, ''), COALESCE(h.derniere, '')), '')
+        FROM Cours c
+        LEFT JOIN (SELECT cours_id, SUM(note) AS somme, COUNT(note) AS n, MAX(date) AS derniere
+                   FROM Avis GROUP BY cours_id) a ON a.cours_id = c.id_cours
+        LEFT JOIN (SELECT cours_id, COUNT(*) AS n, MAX(date_ajout) AS derniere
+                   FROM Favoris GROUP BY cours_id) f ON f.cours_id = c.id_cours
+        LEFT JOIN (SELECT cours_id, COUNT(*) AS n, MAX(date_consultation) AS derniere
+                   FROM Historique_Consultation GROUP BY cours_id) h ON h.cours_id = c.id_cours
+    ''')
+
+    # Table Affinites (intérêt décroissant dans le temps de chaque utilisateur pour chaque cours) ;
+    # remplissage par « python affinites.py », qui dépend de la demi-vie configurée
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Affinites (
+            user_id TEXT NOT NULL,
+            cours_id INTEGER NOT NULL,
+            score REAL NOT NULL DEFAULT 0,
+            date_maj TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, cours_id),
+            FOREIGN KEY (user_id) REFERENCES Utilisateurs(id_user) ON DELETE CASCADE,
+            FOREIGN KEY (cours_id) REFERENCES Cours(id_cours) ON DELETE CASCADE
+        )
+    ''')
+
+    # Table Versions (compteurs servant aux ETag des routes de lecture, voir versions.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS Versions (
+            cle TEXT PRIMARY KEY,
+            valeur INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Index plein texte des cours (voir recherche.py) : accents ignorés, mots-clés tirés des attributs du cours
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS Cours_fts USING fts5(
+            nom, domaine, objectifs, mots_cles,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    # Synchronisation par déclencheurs : le rowid de Cours_fts est l'id_cours
+    c.executescript('''
+        CREATE TRIGGER IF NOT EXISTS Cours_fts_insertion AFTER INSERT ON Cours BEGIN
+            INSERT INTO Cours_fts (rowid, nom, domaine, objectifs, mots_cles)
+            VALUES (new.id_cours, new.nom, new.domaine, new.objectifs,
+                    new.type_ressource || ' ' || new.niveau || ' ' || new.langue);
+        END;
+        CREATE TRIGGER IF NOT EXISTS Cours_fts_suppression AFTER DELETE ON Cours BEGIN
+            DELETE FROM Cours_fts WHERE rowid = old.id_cours;
+        END;
+        CREATE TRIGGER IF NOT EXISTS Cours_fts_modification
+        AFTER UPDATE OF id_cours, nom, domaine, objectifs, type_ressource, niveau, langue ON Cours BEGIN
+            DELETE FROM Cours_fts WHERE rowid = old.id_cours;
+            INSERT INTO Cours_fts (rowid, nom, domaine, objectifs, mots_cles)
+            VALUES (new.id_cours, new.nom, new.domaine, new.objectifs,
+                    new.type_ressource || ' ' || new.niveau || ' ' || new.langue);
+        END;
+    ''')
+
+    # Remplissage initial des cours existants
+    c.execute('''
+        INSERT INTO Cours_fts (rowid, nom, domaine, objectifs, mots_cles)
+        SELECT id_cours, nom, domaine, objectifs, type_ressource || ' ' || niveau || ' ' || langue
+        FROM Cours
+        WHERE id_cours NOT IN (SELECT rowid FROM Cours_fts)
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    initialiser(sys.argv[1] if len(sys.argv) > 1 else 'recommandation.db')
@@ -0,0 +1,62 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : le provider par défaut de Flask (json) est alors conservé
+    orjson = None
+
+# Provider JSON de l'application : "auto" (orjson s'il est installé), "orjson" ou "json" (module standard).
+# Les sorties restent celles de Flask (clés triées, dates au format HTTP) : seuls l'encodeur et
+# l'échappement des caractères non ASCII (orjson écrit de l'UTF-8) changent.
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider dont l'encodage passe par orjson, sauf options propres au module json."""
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_octets(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_octets(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Octets produits par orjson transmis tels quels, sans passer par une chaîne
+        corps = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(corps, mimetype=self.mimetype)
+
+
+def installer_json(app):
+    """Remplace le provider JSON de l'application selon JSON_PROVIDER ; retourne le nom du provider retenu."""
+    choix = app.config.setdefault('JSON_PROVIDER', 'auto')
+    if choix not in ("auto", "orjson", "json"):
+        raise ValueError(f"JSON_PROVIDER inconnu : {choix!r} (auto, orjson ou json)")
+    if choix == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson mais le paquet orjson n'est pas installé.")
+    if choix == "json" or orjson is None:
+        app.json = DefaultJSONProvider(app)
+        return "json"
+    app.json = OrjsonProvider(app)
+    return "orjson"
+
+
+def dumps_octets(app, obj):
+    """JSON encodé en octets avec le provider de l'application (sans détour par une chaîne si possible)."""
+    encoder = getattr(app.json, "dumps_octets", None)
+    return encoder(obj) if encoder is not None else app.json.dumps(obj).encode("utf-8")
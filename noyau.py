@@ -0,0 +1,54 @@
+import numpy as np
+
+
+# Noyau de classement partagé par les stratégies de recommandation : masques d'exclusion booléens,
+# top-k par argpartition (sans trier tout le catalogue) et agrégation vectorisée des lignes voisines.
+
+
+def masque_exclusion(ids, exclus):
+    """Masque booléen des éléments de ids (triés) présents dans exclus, par recherche dichotomique."""
+    ids = np.asarray(ids)
+    exclus = np.asarray(exclus, dtype=ids.dtype)
+    masque = np.zeros(len(ids), dtype=bool)
+    if len(ids) == 0 or len(exclus) == 0:
+        return masque
+    positions = np.minimum(np.searchsorted(ids, exclus), len(ids) - 1)
+    masque[positions[ids[positions] == exclus]] = True
+    return masque
+
+
+def top_k(scores, k, exclus=None, departages=()):
+    """Indices des k meilleurs scores finis, par ordre décroissant.
+
+    exclus est un masque booléen des positions à écarter ; departages est une suite de clés
+    secondaires (décroissantes, par priorité) pour classer les ex aequo, puis l'indice croissant.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    valides = np.isfinite(scores)
+    if exclus is not None:
+        valides &= ~exclus
+    candidats = np.flatnonzero(valides)
+    if k <= 0 or len(candidats) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    valeurs = scores[candidats]
+    if len(candidats) > k:
+        # Seuil du k-ième score ; les ex aequo au seuil sont gardés pour être départagés
+        seuil = valeurs[np.argpartition(-valeurs, k - 1)[k - 1]]
+        garder = valeurs >= seuil
+        candidats, valeurs = candidats[garder], valeurs[garder]
+
+    # np.lexsort classe selon la dernière clé d'abord ; le tri est stable (indice croissant en dernier)
+    cles = [-np.asarray(d, dtype=np.float64)[candidats] for d in reversed(departages)] + [-valeurs]
+    return candidats[np.lexsort(cles)[:k]]
+
+
+def agreger_lignes(matrice, lignes, seuil=None):
+    """Somme des lignes choisies d'une matrice creuse (valeurs > seuil uniquement), en vecteur dense."""
+    sous_matrice = matrice[lignes]
+    valeurs = sous_matrice.data
+    colonnes = sous_matrice.indices
+    if seuil is not None:
+        garder = valeurs > seuil
+        valeurs, colonnes = valeurs[garder], colonnes[garder]
+    return np.bincount(colonnes, weights=valeurs, minlength=matrice.shape[1])
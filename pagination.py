@@ -0,0 +1,103 @@
+import base64
+import json
+
+import numpy as np
+
+from flask import Response, jsonify, request
+from sqlalchemy import func, literal_column, select, tuple_
+
+from Models import app, db
+
+# Nombre maximal d'éléments par page, quelle que soit la limite demandée
+app.config.setdefault('PAGINATION_LIMITE_MAX', 200)
+
+
+# Pagination par clé (keyset) : la page suivante commence strictement après les valeurs des
+# colonnes de tri du dernier élément, transmises au client sous forme de curseur opaque.
+# Les colonnes de tri doivent identifier chaque ligne (l'identifiant en dernier).
+
+def encoder_curseur(valeurs):
+    return base64.urlsafe_b64encode(json.dumps(list(valeurs)).encode("utf-8")).decode("ascii")
+
+
+def decoder_curseur(curseur):
+    return json.loads(base64.urlsafe_b64decode(curseur.encode("ascii")))
+
+
+def lire_pagination():
+    """Paramètres limit et after de la requête ; limit absent : pas de pagination (réponse complète).
+
+    Lève ValueError si l'un des deux est invalide.
+    """
+    limite, apres = request.args.get('limit'), request.args.get('after')
+    if limite is None:
+        return None, None
+    try:
+        limite = min(max(int(limite), 1), app.config['PAGINATION_LIMITE_MAX'])
+    except ValueError:
+        raise ValueError("Paramètre limit invalide.")
+    if apres:
+        try:
+            apres = decoder_curseur(apres)
+        except (ValueError, UnicodeError):
+            raise ValueError("Curseur invalide.")
+        # Valeurs de tri transmises telles quelles à SQL : scalaires seulement
+        if not isinstance(apres, list) or not all(
+            isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in apres
+        ):
+            raise ValueError("Curseur invalide.")
+    return limite, apres or None
+
+
+def lire_page(query, tri, limite, apres=None):
+    """Une page d'une requête ORM triée sur les colonnes tri ; retourne (éléments, valeurs de tri du dernier ou None).
+
+    Les éléments sont les entités, ou des tuples si la requête porte sur plusieurs colonnes.
+    """
+    if apres is not None:
+        if len(apres) != len(tri):
+            raise ValueError("Curseur invalide.")
+        query = query.filter(tuple_(*tri) > tuple_(*apres))
+    n = len(query.column_descriptions)
+    # Une ligne de plus que demandé indique s'il reste une page ; les valeurs de tri sont lues avec chaque ligne
+    rows = query.add_columns(*tri).order_by(*tri).limit(limite + 1).all()
+    suivant = list(rows[limite - 1][n:]) if len(rows) > limite else None
+    return [row[0] if n == 1 else tuple(row[:n]) for row in rows[:limite]], suivant
+
+
+def paginer(query, tri, limite, apres=None):
+    """Une page d'une requête ORM triée sur les colonnes tri ; retourne (éléments, curseur suivant ou None)."""
+    elements, suivant = lire_page(query, tri, limite, apres)
+    return elements, encoder_curseur(suivant) if suivant is not None else None
+
+
+def paginer_ids(ids, limite, apres=None):
+    """Même découpage qu'avec paginer(), sur un tableau d'identifiants triés déjà calculé (tri : identifiant seul)."""
+    debut = 0
+    if apres is not None:
+        if len(apres) != 1 or not isinstance(apres[0], int):
+            raise ValueError("Curseur invalide.")
+        debut = int(np.searchsorted(ids, apres[0], side="right"))
+    page = ids[debut:debut + limite]
+    suivant = encoder_curseur([int(page[-1])]) if debut + limite < len(ids) else None
+    return page, suivant
+
+
+def estimer_total(modele, query=None):
+    """Nombre approximatif de lignes : sans filtre, l'écart des rowid extrêmes (deux lectures d'index sous SQLite) ; sinon un COUNT."""
+    if query is None and db.engine.dialect.name == "sqlite":
+        # Deux sous-requêtes : SQLite n'optimise MIN et MAX que seuls dans leur SELECT
+        extremes = [select(f(literal_column("rowid"))).select_from(modele.__table__).scalar_subquery() for f in (func.min, func.max)]
+        premier, dernier = db.session.execute(select(*extremes)).one()
+        return dernier - premier + 1 if dernier is not None else 0
+    return (query if query is not None else modele.query).order_by(None).count()
+
+
+def reponse_paginee(donnees, suivant, total=None):
+    """Liste JSON habituelle (ou réponse déjà construite) ; le curseur de la page suivante et le total estimé passent dans les en-têtes."""
+    reponse = donnees if isinstance(donnees, Response) else jsonify(donnees)
+    if suivant:
+        reponse.headers["X-Curseur-Suivant"] = suivant
+    if total is not None:
+        reponse.headers["X-Total-Estime"] = str(total)
+    return reponse
@@ -0,0 +1,121 @@
+"""Précalcule les recommandations de chaque utilisateur dans la table Recommandations.
+
+Seuls les utilisateurs dont les interactions ou le profil ont changé depuis le dernier
+passage sont recalculés ; --tous force le recalcul complet (à planifier moins souvent,
+car la popularité des cours évolue aussi avec l'activité des autres utilisateurs).
+
+Exemple : python rafraichir_recommandations.py --top-n 50
+"""
+import argparse
+import hashlib
+import time
+
+from sqlalchemy import func, insert
+
+from Models import (app, db, Utilisateurs, Historique_Consultation, Favoris, Avis, Profils_Utilisateurs,
+                    Recommandations, Recommandations_Etat)
+from courses import cours_recommandes
+from recommendations import hybrid_recommendations
+from versions import incrementer_versions
+
+
+def signatures_utilisateurs():
+    """Empreinte des interactions et du profil de chaque utilisateur (une requête agrégée par table)."""
+    morceaux = {user_id: [] for (user_id,) in db.session.query(Utilisateurs.id_user)}
+
+    def ajouter(prefixe, requete):
+        for user_id, *valeurs in requete:
+            if user_id in morceaux:
+                morceaux[user_id].append(prefixe + ":" + "|".join(str(v) for v in valeurs))
+
+    ajouter("h", db.session.query(
+        Historique_Consultation.user_id, func.count(), func.max(Historique_Consultation.id_historique)
+    ).group_by(Historique_Consultation.user_id))
+    ajouter("f", db.session.query(
+        Favoris.user_id, func.count(), func.max(Favoris.id_favoris)
+    ).group_by(Favoris.user_id))
+    ajouter("a", db.session.query(
+        Avis.user_id, func.count(), func.max(Avis.id_avis), func.sum(Avis.note)
+    ).group_by(Avis.user_id))
+    ajouter("p", db.session.query(
+        Profils_Utilisateurs.user_id, Profils_Utilisateurs.domaine_intérêt,
+        Profils_Utilisateurs.objectifs, Profils_Utilisateurs.date_mise_à_jour
+    ))
+
+    return {
+        user_id: hashlib.sha1("\n".join(sorted(m)).encode("utf-8")).hexdigest()
+        for user_id, m in morceaux.items()
+    }
+
+
+def materialiser(user_id, top_n=50, strategies=("populaire", "hybride")):
+    """Remplace les recommandations stockées d'un utilisateur par un nouveau calcul."""
+    lignes = []
+    if "populaire" in strategies:
+        lignes += [{
+            "user_id": user_id,
+            "cours_id": c["id_cours"],
+            "stratégie": "populaire",
+            "rang": rang,
+            "score": c["score"],
+            "moyenne_note": c["moyenne_note"],
+        } for rang, c in enumerate(cours_recommandes(user_id)[:top_n])]
+    if "hybride" in strategies:
+        lignes += [{
+            "user_id": user_id,
+            "cours_id": c.id_cours,
+            "stratégie": "hybride",
+            "rang": rang,
+            "score": None,
+            "moyenne_note": None,
+        } for rang, c in enumerate(hybrid_recommendations(user_id, top_n=top_n))]
+
+    # Seules les stratégies recalculées sont remplacées
+    Recommandations.query.filter(
+        Recommandations.user_id == user_id, Recommandations.stratégie.in_(strategies)
+    ).delete(synchronize_session=False)
+    if lignes:
+        db.session.execute(insert(Recommandations), lignes)
+
+
+def rafraichir(top_n=50, strategies=("populaire", "hybride"), tous=False, taille_lot=200):
+    """Recalcule les utilisateurs modifiés depuis le dernier passage ; retourne leur nombre."""
+    signatures = signatures_utilisateurs()
+    anciennes = {}
+    for user_id, stratégie, signature in db.session.query(
+        Recommandations_Etat.user_id, Recommandations_Etat.stratégie, Recommandations_Etat.signature
+    ).filter(Recommandations_Etat.stratégie.in_(strategies)):
+        anciennes[(user_id, stratégie)] = signature
+    # Un utilisateur est recalculé si l'une des stratégies demandées n'est pas à jour pour lui
+    a_calculer = [u for u, sig in signatures.items()
+                  if tous or any(anciennes.get((u, s)) != sig for s in strategies)]
+
+    for i, user_id in enumerate(a_calculer, start=1):
+        materialiser(user_id, top_n, strategies)
+        for stratégie in strategies:
+            db.session.merge(Recommandations_Etat(
+                user_id=user_id, stratégie=stratégie, signature=signatures[user_id],
+                date_calcul=func.current_timestamp()
+            ))
+        if i % taille_lot == 0:
+            db.session.commit()
+    if a_calculer:
+        incrementer_versions("recommandations")
+    db.session.commit()
+    return len(a_calculer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-n", type=int, default=50)
+    parser.add_argument("--strategies", nargs="+", default=["populaire", "hybride"], choices=["populaire", "hybride"])
+    parser.add_argument("--tous", action="store_true", help="recalculer tous les utilisateurs")
+    args = parser.parse_args()
+
+    # Calcul hors ligne : pas de délai sur les branches de l'hybride
+    app.config['RECO_DELAI_HYBRIDE'] = None
+
+    with app.app_context():
+        debut = time.perf_counter()
+        n = rafraichir(args.top_n, args.strategies, args.tous)
+        print(f"📌 {n} utilisateur(s) recalculé(s) en {time.perf_counter() - debut:.1f}s")
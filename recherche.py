@@ -0,0 +1,46 @@
+import re
+
+from sqlalchemy import func, inspect, literal_column, select, text
+
+from Models import db, Cours
+from texte import normaliser
+
+# Index plein texte des cours (table virtuelle FTS5 créée et synchronisée par init_db.py).
+# Poids BM25 de chaque colonne, dans l'ordre de la table : nom, domaine, objectifs, mots_cles
+POIDS_COLONNES = (10.0, 2.0, 2.0, 1.0)
+
+_disponible = {}  # URL de la base -> la table Cours_fts existe
+
+
+def _fts_disponible():
+    # FTS5 n'existe que sous SQLite : ailleurs (ou sur une base non migrée), on garde ILIKE
+    url = str(db.engine.url)
+    if url not in _disponible:
+        _disponible[url] = db.engine.dialect.name == "sqlite" and inspect(db.engine).has_table("Cours_fts")
+    return _disponible[url]
+
+
+def motif_fts(recherche):
+    """Expression MATCH où chaque mot saisi est un préfixe obligatoire (« intro math » → "intro"* "math"*)."""
+    return " ".join(f'"{mot}"*' for mot in re.findall(r"\w+", recherche))
+
+
+def filtrer_recherche(query, recherche):
+    """Restreint une requête sur Cours au texte recherché ; les autres filtres se combinent ensuite.
+
+    Retourne la requête et ses colonnes de tri : pertinence BM25 puis identifiant.
+    """
+    motif = motif_fts(recherche)
+    if not motif or not _fts_disponible():
+        # Sans mot exploitable (ponctuation seule), on garde la recherche par sous-chaîne, sans accents
+        return query.filter(Cours.nom_normalise.contains(normaliser(recherche), autoescape=True)), (Cours.id_cours,)
+
+    # bm25() est négatif : plus il est petit, plus le cours est pertinent
+    rang = func.bm25(literal_column("Cours_fts"), *POIDS_COLONNES)
+    resultats = (
+        select(literal_column("rowid").label("id_cours"), rang.label("rang"))
+        .select_from(text("Cours_fts"))
+        .where(text("Cours_fts MATCH :motif").bindparams(motif=motif))
+        .subquery()
+    )
+    return query.join(resultats, resultats.c.id_cours == Cours.id_cours), (resultats.c.rang, Cours.id_cours)
@@ -1,16 +1,207 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
+import hashlib
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
-import pandas as pd
+from scipy import sparse
+from flask import g, has_app_context
+from sqlalchemy import func, literal, select, union_all
 from Models import *
+from index_voisins import creer_index
+from artefacts import charger, publier
+from affinites import scores_courants
+from noyau import agreger_lignes, masque_exclusion, top_k
+from cache import cache_utilisateur, marquer_incomplet, vider_caches
+from segments import liste_segment, invalider_segments
+from suggestions import invalider_suggestions
+from versions import version_catalogue, lire_versions
+
+
+# Matrice des cours partagée par tout le processus : elle n'est reconstruite que lorsque la version
+# « catalogue » de la table Versions change (ajout, modification ou suppression d'un cours, quel que
+# soit le processus qui l'a traitée).
+_catalogue_lock = threading.Lock()
+_catalogue = {"snapshot": None}
+
+
+def invalider_catalogue():
+    """Signale une modification de la table Cours aux caches de ce processus (la matrice suit la version en base)."""
+    vider_caches()
+    invalider_segments()
+    invalider_suggestions()
+
+
+# Valeurs autorisées par les contraintes CHECK de Models.Cours
+CATEGORIES_COURS = {
+    "domaine": ('Informatique', 'Mathématiques', 'Physique', 'Chimie', 'Langues'),
+    "objectifs": ('Révision', 'Préparation examen', 'Apprentissage', 'Approfondissement'),
+    "niveau": ('Débutant', 'Intermédiaire', 'Avancé'),
+    "langue": ('Français', 'Anglais', 'Arabe'),
+    "type_ressource": ('Tutoriel', 'Cours', 'Livre', 'TD'),
+}
+
+# Poids de chaque colonne dans la représentation d'un cours (modifiable via app.config)
+POIDS_CATEGORIES = {"domaine": 29, "objectifs": 3, "niveau": 2, "langue": 2, "type_ressource": 1}
+app.config.setdefault('RECO_POIDS_CATEGORIES', POIDS_CATEGORIES)
+
+
+def encoder_cours(colonnes, poids=None):
+    """Encode les colonnes catégorielles des cours en une matrice CSR pondérée, normée L2 par ligne."""
+    poids = poids or app.config['RECO_POIDS_CATEGORIES']
+    n = len(colonnes["domaine"])
+    indices = np.zeros((n, len(CATEGORIES_COURS)), dtype=np.int32)
+    data = np.zeros((n, len(CATEGORIES_COURS)), dtype=np.float32)
+
+    decalage = 0
+    for j, (nom, valeurs) in enumerate(CATEGORIES_COURS.items()):
+        vocab = np.array(valeurs, dtype=str)
+        ordre = np.argsort(vocab)
+        vocab_trie = vocab[ordre]
+        col = np.asarray(colonnes[nom], dtype=str)
+
+        # Recherche vectorisée du code de chaque valeur ; les valeurs inconnues gardent un poids nul
+        pos = np.minimum(np.searchsorted(vocab_trie, col), len(vocab) - 1)
+        connu = vocab_trie[pos] == col
+        indices[:, j] = ordre[pos] + decalage
+        data[:, j] = np.where(connu, poids.get(nom, 0), 0)
+        decalage += len(valeurs)
+
+    normes = np.sqrt((data ** 2).sum(axis=1, keepdims=True))
+    data = np.divide(data, normes, out=np.zeros_like(data), where=normes > 0)
+
+    matrice = sparse.csr_matrix(
+        (data.ravel(), indices.ravel(), np.arange(0, data.size + 1, len(CATEGORIES_COURS))),
+        shape=(n, decalage),
+    )
+    matrice.eliminate_zeros()
+    return matrice
+
+
+def get_catalogue():
+    """Retourne la matrice des caractéristiques de tout le catalogue, construite une seule fois par version."""
+    version = version_catalogue()
+    with _catalogue_lock:
+        snapshot = _catalogue["snapshot"]
+    if snapshot is not None and snapshot["version"] == version:
+        return snapshot
+
+    rows = db.session.query(
+        Cours.id_cours, Cours.domaine, Cours.objectifs, Cours.niveau, Cours.langue, Cours.type_ressource
+    ).order_by(Cours.id_cours).all()
+
+    # La matrice est partagée entre processus via un artefact projeté en mémoire : un worker ne la
+    # republie que si son empreinte (lignes du catalogue et poids) diffère de la version en service
+    empreinte = hashlib.sha1(json.dumps(
+        [[tuple(r) for r in rows], app.config['RECO_POIDS_CATEGORIES']], ensure_ascii=False
+    ).encode("utf-8")).hexdigest()
+    publie = charger("catalogue")
+    if publie is None or publie["meta"].get("empreinte") != empreinte:
+        publier("catalogue", {
+            "ids": np.array([r.id_cours for r in rows], dtype=np.int64),
+            "domaines": np.array([r.domaine for r in rows], dtype=str),
+            "objectifs": np.array([r.objectifs for r in rows], dtype=str),
+            "matrice": encoder_cours({
+                "domaine": [r.domaine for r in rows],
+                "objectifs": [r.objectifs for r in rows],
+                "niveau": [r.niveau for r in rows],
+                "langue": [r.langue for r in rows],
+                "type_ressource": [r.type_ressource for r in rows],
+            }),
+        }, meta={"empreinte": empreinte})
+        publie = charger("catalogue")
+
+    snapshot = {
+        "version": version,
+        "ids": publie["ids"],
+        "domaines": publie["domaines"],
+        "objectifs": publie["objectifs"],
+        "matrice": publie["matrice"],
+    }
+    with _catalogue_lock:
+        # Une requête concurrente a pu installer un snapshot plus récent pendant la construction
+        courant = _catalogue["snapshot"]
+        if courant is None or courant["version"] <= version:
+            _catalogue["snapshot"] = snapshot
+    return snapshot
+
+
+def get_voisins_cours():
+    """Retourne la table {ids, voisins, scores} des cours similaires (voir voisins_cours.py)."""
+    return charger("voisins_cours")
+
+
+def _positions_voisins(table, cours_ids):
+    # Position de chaque cours dans la table (les ids y sont triés) ; -1 si absent
+    cours_ids = np.asarray(list(cours_ids), dtype=np.int64)
+    if len(table["ids"]) == 0 or len(cours_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(table["ids"], cours_ids), len(table["ids"]) - 1)
+    return positions[table["ids"][positions] == cours_ids]
+
+
+def cours_similaires(cours_id, n=10):
+    """Liste des (id_cours, score) les plus similaires à un cours, par simple lecture de la table."""
+    table = get_voisins_cours()
+    if table is None:
+        return []
+    positions = _positions_voisins(table, [cours_id])
+    if len(positions) == 0:
+        return []
+    voisins, scores = table["voisins"][positions[0]], table["scores"][positions[0]]
+    return [(int(cid), float(score)) for cid, score in zip(voisins[:n], scores[:n]) if cid >= 0]
+
+
+# Cours avec lesquels un utilisateur a interagi, en tableaux d'identifiants triés et uniques ;
+# affinites donne l'intérêt courant pour chaque cours de vus (voir affinites.py)
+Interactions = namedtuple("Interactions", ["historique", "avis", "favoris", "vus", "affinites"])
+
+
+def charger_interactions(user_id):
+    """Historique, avis, favoris et affinités d'un utilisateur en une seule requête, mémorisés le temps de la requête."""
+    memo = g.setdefault("interactions", {}) if has_app_context() else {}
+    if user_id in memo:
+        return memo[user_id]
+
+    requete = union_all(
+        select(literal(0).label("source"), Historique_Consultation.cours_id, literal(0.0).label("score"))
+        .where(Historique_Consultation.user_id == user_id),
+        select(literal(1), Avis.cours_id, literal(0.0)).where(Avis.user_id == user_id),
+        select(literal(2), Favoris.cours_id, literal(0.0)).where(Favoris.user_id == user_id),
+        select(literal(3), Affinites.cours_id, Affinites.score).where(Affinites.user_id == user_id),
+    )
+    rows = np.array(db.session.execute(requete).all(), dtype=np.float64).reshape(-1, 3)
+    sources, ids = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64)
+    historique, avis, favoris = (np.unique(ids[sources == source]) for source in range(3))
+    vus = np.union1d(np.union1d(historique, avis), favoris)
+
+    # Un cours vu sans ligne d'affinité (table pas encore remplie) garde une affinité nulle
+    affinites = np.zeros(len(vus))
+    lues = sources == 3
+    positions = np.minimum(np.searchsorted(vus, ids[lues]), max(len(vus) - 1, 0))
+    connus = (vus[positions] == ids[lues]) if len(vus) else np.zeros(int(lues.sum()), dtype=bool)
+    affinites[positions[connus]] = scores_courants(rows[lues, 2][connus])
+
+    memo[user_id] = Interactions(historique, avis, favoris, vus, affinites)
+    return memo[user_id]
+
+
+def contient(ids_tries, cours_id):
+    """Test d'appartenance par recherche dichotomique dans un tableau d'identifiants triés."""
+    i = np.searchsorted(ids_tries, cours_id)
+    return bool(i < len(ids_tries) and ids_tries[i] == cours_id)
 
 
 def get_user_data(user_id):
-    historique_ids = [h.cours_id for h in Historique_Consultation.query.filter_by(user_id=user_id).all()]
-    avis_ids = [a.cours_id for a in Avis.query.filter_by(user_id=user_id).all()]
-    favoris_ids = [f.cours_id for f in Favoris.query.filter_by(user_id=user_id).all()]
-    return set(historique_ids + avis_ids + favoris_ids)
+    """Cours vus, notés ou favoris (identifiants triés) et l'affinité courante de l'utilisateur pour chacun."""
+    interactions = charger_interactions(user_id)
+    return interactions.vus, interactions.affinites
+
+
+def _ponderation(affinites):
+    # Sans affinités calculées pour cet utilisateur, chaque cours pèse autant
+    return affinites if affinites.sum() > 0 else np.ones(len(affinites))
 
 
 
@@ -22,110 +213,382 @@ def content_similarity_recommendations(user_id, top_n=5, sort_by_views=False):
     domaine_pref = profil.domaine_intérêt
     objectifs_pref = profil.objectifs
 
-    cours_all = Cours.query.all()
-    user_cours_ids = get_user_data(user_id)
+    catalogue = get_catalogue()
+    user_cours_ids, affinites = get_user_data(user_id)
 
-    # Filtrage des cours du même domaine et éventuellement des mêmes objectifs
-    cours_filtrés = [
-        c for c in cours_all
-        if c.domaine == domaine_pref and (not objectifs_pref or c.objectifs == objectifs_pref)
-    ]
-    if not cours_filtrés:
+    # Filtrage des cours du même domaine et éventuellement des mêmes objectifs (sans réentraîner)
+    masque = catalogue["domaines"] == domaine_pref
+    if objectifs_pref:
+        masque &= catalogue["objectifs"] == objectifs_pref
+    indices = np.flatnonzero(masque)
+    if len(indices) == 0:
         return []
 
-    # Création d'une représentation textuelle pondérée pour chaque cours
-    cours_df = [{
-        'id': c.id_cours,
-        'cours': c,
-        'text': (
-            f"{(c.domaine + ' ') * 29}"
-            f"{(c.objectifs + ' ') * 3}"
-            f"{(c.niveau + ' ') * 2}"
-            f"{(c.langue + ' ') * 2}"
-            f"{(c.type_ressource + ' ') * 1}"
-        )
-    } for c in cours_filtrés]
-
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([c['text'] for c in cours_df])
-    cours_id_to_index = {c['id']: idx for idx, c in enumerate(cours_df)}
-
-    user_indices = [cours_id_to_index[cid] for cid in user_cours_ids if cid in cours_id_to_index]
-    if not user_indices:
-        return []
+    ids_filtrés = catalogue["ids"][indices]
+    features = catalogue["matrice"][indices]
+    deja_vus = masque_exclusion(ids_filtrés, user_cours_ids)
 
-    mean_user_vector = np.asarray(tfidf_matrix[user_indices].mean(axis=0))
-    similarities = cosine_similarity(mean_user_vector, tfidf_matrix).flatten()
+    user_indices = np.flatnonzero(deja_vus)
+    if len(user_indices) == 0:
+        return []
 
-    # Tri des indices les plus similaires
-    similar_indices = similarities.argsort()[::-1]
-    recommended = [cours_df[i]['cours'] for i in similar_indices if cours_df[i]['id'] not in user_cours_ids]
+    # Moyenne des cours de l'utilisateur pondérée par son affinité : les plus récents et les plus
+    # appréciés comptent davantage. Les lignes sont normées : le produit scalaire suffit à classer
+    poids = _ponderation(affinites[np.searchsorted(user_cours_ids, ids_filtrés[user_indices])])
+    mean_user_vector = np.asarray(features[user_indices].T @ poids).ravel() / poids.sum()
+    similarities = features @ mean_user_vector
 
-    # Tri optionnel par nombre de vues
+    # Top-k des plus similaires hors cours déjà vus (ex aequo : les cours les plus récents d'abord)
     if sort_by_views:
-        recommended.sort(key=lambda c: c.nombre_vues, reverse=True)
+        # Tri optionnel par nombre de vues, la similarité départageant les ex aequo
+        requete = db.session.query(Cours.id_cours, Cours.nombre_vues).filter(Cours.domaine == domaine_pref)
+        if objectifs_pref:
+            requete = requete.filter(Cours.objectifs == objectifs_pref)
+        lues = np.array([(cid, v or 0) for cid, v in requete], dtype=np.int64).reshape(-1, 2)
+        vues = np.zeros(len(ids_filtrés))
+        positions = np.minimum(np.searchsorted(ids_filtrés, lues[:, 0]), max(len(ids_filtrés) - 1, 0))
+        connus = ids_filtrés[positions] == lues[:, 0]
+        vues[positions[connus]] = lues[connus, 1]
+        meilleurs = top_k(vues, top_n, exclus=deja_vus, departages=(similarities, ids_filtrés))
+    else:
+        meilleurs = top_k(similarities, top_n, exclus=deja_vus, departages=(ids_filtrés,))
+
+    recommended_ids = ids_filtrés[meilleurs].tolist()
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_(recommended_ids)).all()}
+    recommended = [cours_map[cid] for cid in recommended_ids if cid in cours_map]
+
+    return recommended
+
+
+
+
+
+# Matrice creuse utilisateurs × cours des notes, chargée une fois puis mise à jour à chaque avis.
+# Les index des utilisateurs et des cours sont stables : on ne fait qu'ajouter en fin de liste.
+# Elle suit la version « notes » en base : rechargée quand un autre processus a écrit un avis.
+_notes_lock = threading.Lock()
+_notes = {"matrice": None, "users": {}, "cours": {}, "cours_ids": [], "en_attente": {}, "modifies": set(), "index": None,
+          "version": None, "charge_le": 0.0, "attente_depuis": 0.0}
+
+# Nouvelles cases (nouvel utilisateur, nouveau cours ou premier avis) fusionnées par lots : chaque
+# fusion recopie la matrice. Délai (secondes) : attente maximale d'une case avant sa fusion, et écart
+# minimal entre deux rechargements déclenchés par les écritures des autres processus.
+app.config.setdefault('RECO_NOTES_LOT', 256)
+app.config.setdefault('RECO_NOTES_DELAI', 5)
+
+# Index de voisins utilisateur–utilisateur : 'inverse' (listes inversées, résultat exact), 'lsh' (approché)
+# ou 'exact' (force brute) ; rappel et latence mesurés par benchmarks/rappel_voisins.py
+app.config.setdefault('RECO_INDEX_VOISINS', 'inverse')
+app.config.setdefault('RECO_INDEX_PARAMS', {
+    "inverse": {"max_modifiees": 5000},
+    "lsh": {"n_tables": 16, "sondes": 1, "taille_seau": 16, "max_candidats": 2000, "seuil_exact": 5000},
+})
+
+
+def _charger_notes(version):
+    rows = db.session.query(Avis.user_id, Avis.cours_id, func.avg(Avis.note)).group_by(Avis.user_id, Avis.cours_id).all()
+    users, cours, cours_ids = {}, {}, []
+    lignes, colonnes, valeurs = [], [], []
+    for user_id, cours_id, note in rows:
+        if user_id not in users:
+            users[user_id] = len(users)
+        if cours_id not in cours:
+            cours[cours_id] = len(cours_ids)
+            cours_ids.append(cours_id)
+        lignes.append(users[user_id])
+        colonnes.append(cours[cours_id])
+        valeurs.append(note)
+
+    matrice = sparse.csr_matrix(
+        (np.array(valeurs, dtype=np.float32), (np.array(lignes, dtype=np.int32), np.array(colonnes, dtype=np.int32))),
+        shape=(len(users), len(cours_ids)),
+    )
+    matrice.sort_indices()
+    index = creer_index(app.config['RECO_INDEX_VOISINS'], app.config['RECO_INDEX_PARAMS'])
+    index.construire(matrice)
+    _notes.update(matrice=matrice, users=users, cours=cours, cours_ids=cours_ids, en_attente={}, modifies=set(), index=index,
+                  version=version, charge_le=time.monotonic())
+
+
+def _fusionner_en_attente():
+    (lignes, colonnes), valeurs = zip(*_notes["en_attente"].keys()), list(_notes["en_attente"].values())
+    forme = (len(_notes["users"]), len(_notes["cours_ids"]))
+    # La matrice publiée n'est pas modifiée (lecteurs en cours) : seul indptr est prolongé pour les nouvelles lignes
+    ancienne = _notes["matrice"]
+    indptr = np.concatenate([ancienne.indptr, np.full(forme[0] - ancienne.shape[0], ancienne.indptr[-1])])
+    matrice = sparse.csr_matrix((ancienne.data, ancienne.indices, indptr), shape=forme, copy=False)
+    ajouts = sparse.csr_matrix((np.array(valeurs, dtype=np.float32), (lignes, colonnes)), shape=forme)
+    matrice = (matrice + ajouts).tocsr()
+    matrice.sort_indices()
+    _notes.update(matrice=matrice, en_attente={})
+
+
+def _suivre_version_notes():
+    # Après un avis commité dans ce processus et répercuté sur la matrice : s'il est le seul depuis le
+    # chargement, la matrice correspond à la nouvelle version ; sinon rechargement au prochain usage
+    version = lire_versions("notes")[0]
+    _notes["version"] = version if _notes["version"] is not None and version == _notes["version"] + 1 else None
+
+
+def get_matrice_notes():
+    """Retourne la matrice des notes, rechargée si un autre processus a écrit un avis depuis son chargement.
+
+    Les nouvelles cases sont fusionnées par lots de RECO_NOTES_LOT, ou au bout de RECO_NOTES_DELAI secondes.
+    """
+    version = lire_versions("notes")[0]
+    with _notes_lock:
+        maintenant = time.monotonic()
+        if _notes["matrice"] is None or (
+            _notes["version"] != version and maintenant - _notes["charge_le"] >= app.config['RECO_NOTES_DELAI']
+        ):
+            _charger_notes(version)
+        elif _notes["en_attente"] and (len(_notes["en_attente"]) >= app.config['RECO_NOTES_LOT']
+                                       or maintenant - _notes["attente_depuis"] >= app.config['RECO_NOTES_DELAI']):
+            _fusionner_en_attente()
+        if _notes["modifies"]:
+            # Insertion incrémentale des utilisateurs dont les notes ont changé (lignes déjà fusionnées)
+            lignes = _notes["matrice"].shape[0]
+            for i in _notes["modifies"]:
+                if i < lignes:
+                    _notes["index"].inserer(i, _notes["matrice"][i])
+            _notes["modifies"] = {i for i in _notes["modifies"] if i >= lignes}
+        return dict(_notes)
+
+
+def maj_note(user_id, cours_id, note):
+    """Répercute l'écriture d'un avis dans la matrice des notes, sans la recharger (après le commit qui incrémente « notes »).
+
+    note : moyenne de tous les avis de l'utilisateur sur le cours, valeur lue par _charger_notes.
+    """
+    with _notes_lock:
+        if _notes["matrice"] is None:
+            return  # Pas encore chargée : elle sera lue depuis la base au premier usage
+
+        if user_id not in _notes["users"]:
+            _notes["users"][user_id] = len(_notes["users"])
+        if cours_id not in _notes["cours"]:
+            _notes["cours"][cours_id] = len(_notes["cours_ids"])
+            _notes["cours_ids"].append(cours_id)
+        i, j = _notes["users"][user_id], _notes["cours"][cours_id]
+        _notes["modifies"].add(i)
+
+        _suivre_version_notes()
+
+        # Case déjà présente : modification en place
+        matrice = _notes["matrice"]
+        if i < matrice.shape[0] and j < matrice.shape[1]:
+            debut, fin = matrice.indptr[i], matrice.indptr[i + 1]
+            k = debut + np.searchsorted(matrice.indices[debut:fin], j)
+            if k < fin and matrice.indices[k] == j:
+                matrice.data[k] = note
+                return
+        if not _notes["en_attente"]:
+            _notes["attente_depuis"] = time.monotonic()
+        _notes["en_attente"][(i, j)] = note
+
+
+def supprimer_cours_notes(cours_id):
+    """Retire les notes d'un cours supprimé de la matrice."""
+    with _notes_lock:
+        j = _notes["cours"].get(cours_id)
+        if _notes["matrice"] is None or j is None:
+            return
+        _notes["matrice"].data[_notes["matrice"].indices == j] = 0
+        _notes["en_attente"] = {cle: v for cle, v in _notes["en_attente"].items() if cle[1] != j}
+        _suivre_version_notes()
+
 
-    return recommended[:top_n]
+def collaborative_knn_recommendations(user_id, k=2, top_n=20, sort_by_views=False):
+    notes = get_matrice_notes()
+    matrice = notes["matrice"]
+    i = notes["users"].get(user_id)
+    # Utilisateur dont la ligne attend encore sa fusion (voir get_matrice_notes) : pas encore de voisins
+    if matrice.shape[0] <= 1 or i is None or i >= matrice.shape[0]:
+        return []
+    cours_ids = notes["cours_ids"][:matrice.shape[1]]
 
+    # Voisins les plus proches au sens du cosinus, via l'index configuré
+    similar_users = notes["index"].voisins(matrice, i, k)
 
+    # Somme des bonnes notes (> 3.5) des voisins, par cours, hors cours déjà vus, notés ou favoris
+    scores = agreger_lignes(matrice, similar_users, seuil=3.5)
+    exclus = scores <= 0
+    exclus[[j for j in (notes["cours"].get(cid) for cid in get_user_data(user_id)[0].tolist())
+            if j is not None and j < len(cours_ids)]] = True
 
+    # Tri par note cumulée, puis par vues si demandé
+    departages = ()
+    if sort_by_views:
+        candidats = np.flatnonzero(~exclus)
+        vues = dict(db.session.query(Cours.id_cours, Cours.nombre_vues).filter(
+            Cours.id_cours.in_([cours_ids[j] for j in candidats])).all())
+        departages = (np.array([vues.get(cid) or 0 for cid in cours_ids], dtype=np.float64),)
+    meilleurs = top_k(scores, top_n, exclus=exclus, departages=departages)
+
+    recommended_ids = [cours_ids[j] for j in meilleurs]
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_(recommended_ids)).all()}
+    return [cours_map[cid] for cid in recommended_ids if cid in cours_map]
 
 
-def collaborative_knn_recommendations(user_id, k=2, top_n=20, sort_by_views=False):
-    avis = Avis.query.all()
-    data = [(a.user_id, a.cours_id, a.note) for a in avis]
-    df = pd.DataFrame(data, columns=["user_id", "cours_id", "note"])
-    
-    pivot = df.pivot_table(index="user_id", columns="cours_id", values="note").fillna(0)
-    # Juste après build_user_course_matrix()
-    if len(pivot) <= 1 or user_id not in pivot.index:
-        return []
 
-    knn = NearestNeighbors(n_neighbors= k + 1, metric='cosine')
-    knn.fit(pivot)
-    distances, indices = knn.kneighbors([pivot.loc[user_id]])
 
-    similar_users = pivot.index[indices.flatten()[1:]]
-    user_courses = get_user_data(user_id)
+def item_item_recommendations(user_id, top_n=20, sort_by_views=False):
+    """Score les cours voisins de ceux déjà vus, notés ou favoris, par lecture de la table des similarités."""
+    table = get_voisins_cours()
+    user_courses, affinites = get_user_data(user_id)
+    if table is None or len(user_courses) == 0:
+        return []
+
+    # Les similarités de chaque cours source sont pondérées par l'affinité de l'utilisateur pour celui-ci
+    positions = _positions_voisins(table, user_courses)
+    poids = _ponderation(affinites)[np.isin(user_courses, table["ids"])]
+    voisins = table["voisins"][positions].ravel()
+    scores = (table["scores"][positions] * poids[:, None]).ravel()
+    garder = (voisins >= 0) & ~np.isin(voisins, user_courses)
+    if not garder.any():
+        return []
 
-    recommended = {}
-    for uid in similar_users:
-        for cid, note in pivot.loc[uid].items():
-            if cid not in user_courses and note > 3.5:
-                recommended[cid] = recommended.get(cid, 0) + note
+    candidats, inverse = np.unique(voisins[garder], return_inverse=True)
+    totaux = np.bincount(inverse, weights=scores[garder])
 
-    cours_recommandés = Cours.query.filter(Cours.id_cours.in_(recommended.keys())).all()
-    cours_map = {c.id_cours: c for c in cours_recommandés}
-    
-    # Tri optionnel par note cumulée, puis par vues si demandé
-    cours_final = [cours_map[cid] for cid, _ in sorted(recommended.items(), key=lambda x: (
-        -x[1], -cours_map[x[0]].nombre_vues if sort_by_views else 0))]
+    if sort_by_views:
+        vues = dict(db.session.query(Cours.id_cours, Cours.nombre_vues).filter(Cours.id_cours.in_(candidats.tolist())).all())
+        nombre_vues = np.array([vues.get(cid) or 0 for cid in candidats.tolist()], dtype=np.float64)
+        recommended_ids = candidats[top_k(nombre_vues, top_n, departages=(totaux,))].tolist()
+    else:
+        recommended_ids = candidats[top_k(totaux, top_n)].tolist()
 
-    return cours_final[:top_n]
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_(recommended_ids)).all()}
+    return [cours_map[cid] for cid in recommended_ids if cid in cours_map]
 
 
+def als_recommendations(user_id, top_n=20, sort_by_views=False):
+    """Recommandations par factorisation implicite (voir factorisation.py) : un seul produit scalaire."""
+    modele = charger("als")
+    if modele is None or len(modele["user_ids"]) == 0:
+        return []
+    u = np.searchsorted(modele["user_ids"], user_id)
+    if u >= len(modele["user_ids"]) or modele["user_ids"][u] != user_id:
+        return []
 
+    scores = modele["cours"] @ modele["users"][u]
+    exclus = masque_exclusion(modele["cours_ids"], get_user_data(user_id)[0])
 
-def hybrid_recommendations(user_id, top_n=20, sort_by_views=False):
-    content = content_similarity_recommendations(user_id, top_n=top_n * 2, sort_by_views=sort_by_views)
-    collaborative = collaborative_knn_recommendations(user_id, top_n=top_n, sort_by_views=sort_by_views)
+    if sort_by_views:
+        ids = modele["cours_ids"][top_k(scores, top_n * 5, exclus=exclus)].tolist()
+        vues = dict(db.session.query(Cours.id_cours, Cours.nombre_vues).filter(Cours.id_cours.in_(ids)).all())
+        recommended_ids = sorted(ids, key=lambda cid: vues.get(cid) or 0, reverse=True)[:top_n]
+    else:
+        recommended_ids = modele["cours_ids"][top_k(scores, top_n, exclus=exclus)].tolist()
+
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_(recommended_ids)).all()}
+    return [cours_map[cid] for cid in recommended_ids if cid in cours_map]
+
+
+# Les branches de l'hybride s'exécutent en parallèle ; au-delà du délai (en secondes, None : sans limite),
+# on fusionne ce qui est terminé et les branches en retard sont ignorées. La première exécution d'une
+# branche dans le processus (chargement des modèles, index et artefacts) n'est pas soumise au délai.
+app.config.setdefault('RECO_DELAI_HYBRIDE', 0.3)
+app.config.setdefault('RECO_THREADS_HYBRIDE', 8)
+
+_executeur = ThreadPoolExecutor(max_workers=app.config['RECO_THREADS_HYBRIDE'], thread_name_prefix="reco-hybride")
+
+# Durées récentes de chaque branche, pour suivre les percentiles de latence
+_temps_lock = threading.Lock()
+_temps_branches = {}   # nom -> deque des dernières durées (secondes)
+_hors_delai = {}       # nom -> nombre de dépassements du délai
+_branches_pretes = set()  # branches déjà exécutées avec succès dans ce processus
+
+
+def _enregistrer_temps(nom, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _temps_lock:
+        _temps_branches.setdefault(nom, deque(maxlen=1000)).append(future.result()[1])
+        _branches_pretes.add(nom)
+
+
+def statistiques_branches():
+    """Percentiles (en millisecondes) des dernières exécutions de chaque branche et nombre de dépassements."""
+    with _temps_lock:
+        durees = {nom: np.array(d) * 1000 for nom, d in _temps_branches.items()}
+        hors_delai = dict(_hors_delai)
+    return {nom: {
+        "executions": len(d),
+        "p50": float(np.percentile(d, 50)),
+        "p95": float(np.percentile(d, 95)),
+        "p99": float(np.percentile(d, 99)),
+        "hors_delai": hors_delai.get(nom, 0),
+    } for nom, d in durees.items()}
+
+
+def _executer_branche(fonction, user_id, interactions, **kwargs):
+    # Chaque thread a son propre contexte d'application, donc sa propre session SQLAlchemy ;
+    # seuls des identifiants en sortent, jamais d'objets ORM liés à cette session
+    debut = time.perf_counter()
+    with app.app_context():
+        g.interactions = {user_id: interactions}
+        ids = [c.id_cours for c in fonction(user_id, **kwargs)]
+    return ids, time.perf_counter() - debut
+
+
+@cache_utilisateur
+def hybrid_recommendations_ids(user_id, top_n=20, sort_by_views=False):
+    # Le cache ne conserve que des identifiants : les objets ORM restent propres à chaque requête
+    interactions = charger_interactions(user_id)
+    branches = {
+        "collaborative": (collaborative_knn_recommendations, top_n),
+        "item_item": (item_item_recommendations, top_n),
+        "content": (content_similarity_recommendations, top_n * 2),
+    }
+    futures = {}
+    for nom, (fonction, n) in branches.items():
+        future = _executeur.submit(_executer_branche, fonction, user_id, interactions, top_n=n, sort_by_views=sort_by_views)
+        future.add_done_callback(lambda f, nom=nom: _enregistrer_temps(nom, f))
+        futures[nom] = future
+
+    delai = app.config['RECO_DELAI_HYBRIDE']
+    with _temps_lock:
+        premieres = [future for nom, future in futures.items() if nom not in _branches_pretes]
+    if delai is not None and premieres:
+        wait(premieres)  # premier chargement des modèles : attendu en entier
+    wait(futures.values(), timeout=delai)
+
+    resultats = {}
+    for nom, future in futures.items():
+        if not future.done():
+            future.cancel()
+            with _temps_lock:
+                _hors_delai[nom] = _hors_delai.get(nom, 0) + 1
+            app.logger.warning("Recommandations hybrides : branche %s hors délai pour %s", nom, user_id)
+            marquer_incomplet()
+        elif future.exception() is not None:
+            app.logger.error("Recommandations hybrides : erreur dans la branche %s pour %s", nom, user_id,
+                             exc_info=future.exception())
+            marquer_incomplet()
+        else:
+            resultats[nom] = future.result()[0]
 
     ids_seen = set()
     results = []
 
-    for c in collaborative + content:
-        if c.id_cours not in ids_seen:
-            results.append(c)
-            ids_seen.add(c.id_cours)
+    for cid in resultats.get("collaborative", []) + resultats.get("item_item", []) + resultats.get("content", []):
+        if cid not in ids_seen:
+            results.append(cid)
+            ids_seen.add(cid)
         if len(results) >= top_n:
             break
 
-    # S’assurer qu'on retourne toujours quelque chose
+    # S’assurer qu'on retourne toujours quelque chose : cours populaires du segment du profil, déjà en mémoire
     if not results:
-        fallback = Cours.query.order_by(Cours.nombre_vues.desc()).limit(top_n).all()
-        return fallback
+        profil = Profils_Utilisateurs.query.filter_by(user_id=user_id).first()
+        segment = liste_segment(profil.domaine_intérêt, profil.objectifs) if profil else liste_segment()
+        return [c["id_cours"] for c in segment[:top_n]]
 
     return results
 
 
-
+def hybrid_recommendations(user_id, top_n=20, sort_by_views=False):
+    ids = hybrid_recommendations_ids(user_id, top_n=top_n, sort_by_views=sort_by_views)
+    cours_map = {c.id_cours: c for c in Cours.query.filter(Cours.id_cours.in_(ids)).all()}
+    return [cours_map[cid] for cid in ids if cid in cours_map]
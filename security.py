@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_login import current_user
 from functools import wraps
-from Models import Utilisateurs, db
+from Models import Utilisateurs, app, db
+from pagination import lire_pagination, paginer, estimer_total, reponse_paginee
+from json_rapide import dumps_octets
+from flux import par_lots, flux_tableau_json, reponse_flux
 
 security_bp = Blueprint('security', __name__)
 
@@ -45,25 +48,38 @@ def check_admin():
 
 
 
+def dict_utilisateur(user):
+    return {
+        'id_user': user.id_user,
+        'nom': user.nom,
+        'prenom': user.prenom,
+        'email': user.email,
+        'rôle': user.rôle,
+        'date_inscription': user.date_inscription.isoformat() if hasattr(user.date_inscription, 'isoformat') else user.date_inscription
+    }
+
+
 @security_bp.route('/api/admin/users', methods=['GET'])
 @login_required_route
 @admin_required
 def get_users():
-    users = Utilisateurs.query.all()
-    users_list = []
-    
-    for user in users:
-        user_data = {
-            'id_user': user.id_user,
-            'nom': user.nom,
-            'prenom': user.prenom,
-            'email': user.email,
-            'rôle': user.rôle,
-            'date_inscription': user.date_inscription.isoformat() if hasattr(user.date_inscription, 'isoformat') else user.date_inscription
-        }
-        users_list.append(user_data)
+    try:
+        limite, apres = lire_pagination()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if limite is None:
+        # Liste complète : lue par lots et envoyée au fil de l'eau
+        lots = par_lots(Utilisateurs.query, (Utilisateurs.id_user,))
+        users_flux = (dumps_octets(app, dict_utilisateur(user)) for user in lots)
+        return reponse_flux(flux_tableau_json(users_flux)), 200
+    try:
+        users, suivant = paginer(Utilisateurs.query, (Utilisateurs.id_user,), limite, apres)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    users_list = [dict_utilisateur(user) for user in users]
     
-    return jsonify(users_list), 200
+    return reponse_paginee(users_list, suivant, estimer_total(Utilisateurs) if apres is None else None), 200
 
 
 @security_bp.route('/api/admin/users/<user_id>/role', methods=['PUT'])
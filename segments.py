@@ -0,0 +1,86 @@
+import threading
+import time
+
+from sqlalchemy import func, desc
+
+from Models import app, db, Cours, Cours_Stats
+from serialisation import dict_cours
+
+# Listes de cours populaires par segment de profil (domaine, objectifs), gardées en mémoire
+# et recalculées en arrière-plan à expiration : un nouvel utilisateur est servi sans requête de classement
+app.config.setdefault('RECO_SEGMENTS_TTL', 600)
+app.config.setdefault('RECO_SEGMENTS_TAILLE', 200)
+
+_segments_lock = threading.Lock()
+_segments = {"listes": None, "expiration": 0.0, "en_cours": False}
+
+
+def requete_populaires():
+    """Cours avec leur note moyenne et leur score de popularité, lus dans Cours_Stats."""
+    moyenne = func.coalesce(Cours_Stats.moyenne, 0)
+    return db.session.query(
+        Cours,
+        moyenne.label("moyenne_note"),
+        (
+            0.3 * Cours.nombre_vues +
+            0.3 * moyenne * 20 +
+            0.2 * func.coalesce(Cours_Stats.nombre_favoris, 0) +
+            0.2 * func.coalesce(Cours_Stats.nombre_consultations, 0)
+        ).label("score")
+    ).outerjoin(Cours_Stats, Cours.id_cours == Cours_Stats.cours_id)
+
+
+def cours_json(cours, moyenne_note, score):
+    return {
+        **dict_cours(cours),
+        "moyenne_note": float(moyenne_note),
+        "score": float(score)
+    }
+
+
+def calculer_segments(taille):
+    """Un seul parcours du catalogue trié par score ; chaque cours alimente les 4 segments qui le contiennent."""
+    listes = {}
+    for cours, moyenne_note, score in requete_populaires().order_by(desc('score')):
+        cles = [(None, None), (cours.domaine, None), (None, cours.objectifs), (cours.domaine, cours.objectifs)]
+        cles = [cle for cle in cles if len(listes.setdefault(cle, [])) < taille]
+        if cles:
+            ligne = cours_json(cours, moyenne_note, score)
+            for cle in cles:
+                listes[cle].append(ligne)
+    return listes
+
+
+def _rafraichir():
+    try:
+        with app.app_context():
+            listes = calculer_segments(app.config['RECO_SEGMENTS_TAILLE'])
+        with _segments_lock:
+            _segments.update(listes=listes, expiration=time.monotonic() + app.config['RECO_SEGMENTS_TTL'])
+    finally:
+        with _segments_lock:
+            _segments["en_cours"] = False
+
+
+def liste_segment(domaine=None, objectifs=None):
+    """Liste classée du segment (à ne pas modifier : elle est partagée entre les requêtes)."""
+    with _segments_lock:
+        listes = _segments["listes"]
+        relancer = listes is not None and time.monotonic() > _segments["expiration"] and not _segments["en_cours"]
+        if relancer:
+            _segments["en_cours"] = True
+    if listes is None:
+        # Premier appel ou catalogue modifié : calcul synchrone
+        listes = calculer_segments(app.config['RECO_SEGMENTS_TAILLE'])
+        with _segments_lock:
+            _segments.update(listes=listes, expiration=time.monotonic() + app.config['RECO_SEGMENTS_TTL'])
+    elif relancer:
+        # Expirées : on sert les listes actuelles pendant le recalcul
+        threading.Thread(target=_rafraichir, daemon=True).start()
+    return listes.get((domaine or None, objectifs or None), [])
+
+
+def invalider_segments():
+    """À appeler quand le catalogue change : les listes seront recalculées au prochain appel."""
+    with _segments_lock:
+        _segments["listes"] = None
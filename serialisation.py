@@ -0,0 +1,73 @@
+from Models import app
+from json_rapide import dumps_octets
+from versions import version_catalogue
+
+# Sérialisation commune des cours. L'objet JSON de chaque cours est encodé une fois puis gardé en
+# mémoire, sans son accolade fermante : une réponse se construit en juxtaposant ces fragments et
+# en y ajoutant les champs propres à la requête (est_favori, note moyenne, date d'ajout...).
+# Un fragment est réencodé quand nombre_vues du cours a changé, et tout le cache est vidé quand la
+# version « catalogue » (écritures admin, tous processus confondus) a avancé.
+CHAMPS_COURS = ("id_cours", "nom", "domaine", "type_ressource", "niveau", "langue", "objectifs", "chemin_source",
+                "nombre_vues")
+
+# (version « catalogue », {id_cours: (nombre_vues, fragment)}) : remplacé d'un bloc, jamais modifié sur place
+_fragments = (None, {})
+
+_EST_FAVORI = {True: b',"est_favori":true}', False: b',"est_favori":false}'}
+
+
+def dict_cours(cours):
+    """Champs communs d'un cours, pour les réponses qui ne passent pas par les fragments."""
+    return {champ: getattr(cours, champ) for champ in CHAMPS_COURS}
+
+
+def _cache_fragments():
+    global _fragments
+    generation = version_catalogue()
+    version, cache = _fragments
+    if version is None or generation > version:
+        # Catalogue modifié : nouveau dictionnaire, les requêtes en cours gardent l'ancien jusqu'au bout
+        version, cache = _fragments = (generation, {})
+    elif generation < version:
+        # Requête ayant lu une version antérieure : ses cours peuvent précéder la modification, rien n'est gardé
+        return {}
+    return cache
+
+
+def fragment_cours(cours):
+    """Objet JSON encodé du cours, sans l'accolade fermante."""
+    cache = _cache_fragments()
+    entree = cache.get(cours.id_cours)
+    if entree is None or entree[0] != cours.nombre_vues:
+        entree = (cours.nombre_vues, dumps_octets(app, dict_cours(cours))[:-1])
+        cache[cours.id_cours] = entree
+    return entree[1]
+
+
+def objet_cours(cours, est_favori=None, **champs):
+    """Objet JSON complet du cours (bytes), avec les champs propres à la requête ajoutés en fin d'objet."""
+    if not champs and est_favori is not None:
+        return fragment_cours(cours) + _EST_FAVORI[bool(est_favori)]
+    if est_favori is not None:
+        champs["est_favori"] = bool(est_favori)
+    if not champs:
+        return fragment_cours(cours) + b"}"
+    return fragment_cours(cours) + b"," + dumps_octets(app, champs)[1:]
+
+
+def tableau_json(objets):
+    """Tableau JSON (bytes) d'objets déjà encodés."""
+    return b"[" + b",".join(objets) + b"]"
+
+
+def reponse_json(corps):
+    """Réponse application/json à partir d'un corps déjà encodé (tableau ou objet)."""
+    if isinstance(corps, list):
+        corps = tableau_json(corps)
+    return app.response_class(corps, mimetype="application/json")
+
+
+def vider_fragments():
+    """Oublie tous les fragments. Réservé aux benchmarks (changement de provider JSON en cours de processus)."""
+    global _fragments
+    _fragments = (None, {})
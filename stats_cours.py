@@ -0,0 +1,46 @@
+from sqlalchemy import func, insert, update
+
+from Models import db, Cours_Stats, Favoris, Historique_Consultation
+from versions import incrementer_versions, cle_cours
+
+
+def maj_stats_cours(cours_id, avis=0, somme_notes=0, favoris=0, consultations=0):
+    """Applique des variations aux agrégats d'un cours dans la transaction en cours (commit à la charge de l'appelant)."""
+    resultat = db.session.execute(
+        update(Cours_Stats).where(Cours_Stats.cours_id == cours_id).values(
+            somme_notes=Cours_Stats.somme_notes + somme_notes,
+            nombre_avis=Cours_Stats.nombre_avis + avis,
+            # Les colonnes à droite désignent les valeurs avant la mise à jour
+            moyenne=func.coalesce(
+                (Cours_Stats.somme_notes + somme_notes) * 1.0 / func.nullif(Cours_Stats.nombre_avis + avis, 0), 0
+            ),
+            nombre_favoris=Cours_Stats.nombre_favoris + favoris,
+            nombre_consultations=Cours_Stats.nombre_consultations + consultations,
+            derniere_activite=func.current_timestamp(),
+        ).execution_options(synchronize_session=False)
+    )
+    if avis or somme_notes or favoris or consultations:
+        # Compteurs visibles modifiés : les réponses qui les affichent changent d'ETag
+        incrementer_versions("activite", cle_cours(cours_id))
+    if resultat.rowcount == 0:
+        # Première activité sur ce cours
+        db.session.execute(insert(Cours_Stats).values(
+            cours_id=cours_id,
+            somme_notes=somme_notes,
+            nombre_avis=avis,
+            moyenne=somme_notes / avis if avis else 0,
+            nombre_favoris=favoris,
+            nombre_consultations=consultations,
+        ))
+
+
+def retirer_stats_utilisateur(user_id, favoris=False, historique=False):
+    """À appeler avant une suppression en masse des favoris ou de l'historique d'un utilisateur."""
+    if favoris:
+        for cours_id, n in db.session.query(Favoris.cours_id, func.count()).filter_by(user_id=user_id).group_by(Favoris.cours_id):
+            maj_stats_cours(cours_id, favoris=-n)
+    if historique:
+        for cours_id, n in db.session.query(
+            Historique_Consultation.cours_id, func.count()
+        ).filter_by(user_id=user_id).group_by(Historique_Consultation.cours_id):
+            maj_stats_cours(cours_id, consultations=-n)
@@ -0,0 +1,101 @@
+import re
+import threading
+import time
+
+import numpy as np
+
+from Models import app, db, Cours
+from noyau import top_k
+from texte import normaliser
+
+# Autocomplétion des noms de cours : tableau trié des noms normalisés (sans accents, en minuscules),
+# une entrée par mot du nom pour qu'un préfixe trouve aussi « linéaire » dans « Algèbre linéaire ».
+# Un préfixe correspond à une tranche contiguë du tableau, trouvée par deux recherches dichotomiques ;
+# pour une saisie de plusieurs mots, on garde les cours présents dans la tranche de chaque mot.
+# Recalculé en arrière-plan à expiration (nombre_vues évolue) et dès que le catalogue change.
+app.config.setdefault('RECO_SUGGESTIONS_TTL', 300)
+
+_suggestions_lock = threading.Lock()
+# generation : incrémentée à chaque invalidation ; un index construit avant n'est pas installé
+_suggestions = {"index": None, "expiration": 0.0, "en_cours": False, "generation": 0}
+
+
+def construire_suggestions():
+    """Clés triées et, pour chacune, la position du cours dans les tableaux ids, noms et vues."""
+    rows = db.session.query(Cours.id_cours, Cours.nom, Cours.nom_normalise, Cours.nombre_vues).order_by(Cours.id_cours).all()
+    cles, positions = [], []
+    for i, (_, nom, nom_normalise, _) in enumerate(rows):
+        texte = nom_normalise if nom_normalise is not None else normaliser(nom)
+        for mot in re.finditer(r"\w+", texte):
+            cles.append(texte[mot.start():])
+            positions.append(i)
+
+    cles = np.array(cles, dtype=str)
+    ordre = np.argsort(cles, kind="stable")
+    return {
+        "cles": cles[ordre],
+        "positions": np.array(positions, dtype=np.int64)[ordre],
+        "ids": np.array([r[0] for r in rows], dtype=np.int64),
+        "noms": [r[1] for r in rows],
+        "vues": np.array([r[3] or 0 for r in rows], dtype=np.float64),
+    }
+
+
+def _installer(index, generation):
+    # À appeler sous le verrou ; ignoré si le catalogue a changé pendant la construction
+    if _suggestions["generation"] == generation:
+        _suggestions.update(index=index, expiration=time.monotonic() + app.config['RECO_SUGGESTIONS_TTL'])
+
+
+def _rafraichir(generation):
+    try:
+        with app.app_context():
+            index = construire_suggestions()
+        with _suggestions_lock:
+            _installer(index, generation)
+    finally:
+        with _suggestions_lock:
+            _suggestions["en_cours"] = False
+
+
+def _index_suggestions():
+    with _suggestions_lock:
+        index, generation = _suggestions["index"], _suggestions["generation"]
+        relancer = index is not None and time.monotonic() > _suggestions["expiration"] and not _suggestions["en_cours"]
+        if relancer:
+            _suggestions["en_cours"] = True
+    if index is None:
+        index = construire_suggestions()
+        with _suggestions_lock:
+            _installer(index, generation)
+    elif relancer:
+        threading.Thread(target=_rafraichir, args=(generation,), daemon=True).start()
+    return index
+
+
+def suggerer(saisie, n=10):
+    """Les n cours les plus vus dont le nom contient un mot commençant par chaque mot saisi (accents et majuscules ignorés)."""
+    mots = re.findall(r"\w+", normaliser(saisie or ""))
+    if not mots:
+        return []
+    index = _index_suggestions()
+    trouves = np.ones(len(index["ids"]), dtype=bool)
+    for mot in mots:
+        debut, fin = np.searchsorted(index["cles"], [mot, mot + "\U0010ffff"])
+        # Masque plutôt que np.unique : pas de tri, même pour un préfixe d'une lettre
+        tranche = np.zeros(len(index["ids"]), dtype=bool)
+        tranche[index["positions"][debut:fin]] = True
+        trouves &= tranche
+    meilleurs = top_k(index["vues"], n, exclus=~trouves)
+    return [{
+        "id_cours": int(index["ids"][i]),
+        "nom": index["noms"][i],
+        "nombre_vues": int(index["vues"][i]),
+    } for i in meilleurs.tolist()]
+
+
+def invalider_suggestions():
+    """À appeler quand le catalogue change : l'index sera reconstruit au prochain appel."""
+    with _suggestions_lock:
+        _suggestions["index"] = None
+        _suggestions["generation"] += 1
@@ -0,0 +1,9 @@
+import unicodedata
+
+
+def normaliser(texte):
+    """Forme de comparaison d'un texte : sans accents et en minuscules (« Mathématiques » → « mathematiques »)."""
+    if texte is None:
+        return None
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
@@ -4,7 +4,12 @@ from flask_wtf.csrf import generate_csrf
 from datetime import datetime
 from email_validator import validate_email, EmailNotValidError
 from security import *
-from Models import db, Cours, Favoris, Historique_Consultation, Profils_Utilisateurs, Utilisateurs, bcrypt
+from Models import db, Affinites, Cours, Favoris, Historique_Consultation, Profils_Utilisateurs, Utilisateurs, bcrypt
+from cache import invalider_utilisateur
+from stats_cours import retirer_stats_utilisateur
+from affinites import recalculer_affinites
+from versions import incrementer_versions, cle_utilisateur
+from serialisation import objet_cours, reponse_json
 
 users_bp = Blueprint('users', __name__)
 
@@ -142,7 +147,9 @@ def update_user_profil():
                 profil.objectifs = data['objectifs']
             profil.date_mise_à_jour = datetime.now()
             
+        incrementer_versions(cle_utilisateur(current_user.id_user))
         db.session.commit()
+        invalider_utilisateur(current_user.id_user)
         
         # Retourner le profil mis à jour
         return jsonify({
@@ -195,11 +202,15 @@ def reset_user_password():
 @login_required_route
 def supprimer_compte_api():
     try:
+        # Retirer les favoris et consultations de l'utilisateur des agrégats des cours
+        retirer_stats_utilisateur(current_user.id_user, favoris=True, historique=True)
+
         # Supprimer d'abord les favoris de l'utilisateur
         Favoris.query.filter_by(user_id=current_user.id_user).delete()
         
         # Supprimer l'historique de consultation de l'utilisateur
         Historique_Consultation.query.filter_by(user_id=current_user.id_user).delete()
+        Affinites.query.filter_by(user_id=current_user.id_user).delete()
         
         # Supprimer le profil de l'utilisateur s'il existe
         Profils_Utilisateurs.query.filter_by(user_id=current_user.id_user).delete()
@@ -224,33 +235,32 @@ def supprimer_compte_api():
 @login_required_route
 def afficher_favoris():
     try:
-        favoris = Favoris.query.filter_by(user_id=current_user.id_user).all()
+        # Jointure : un seul aller-retour au lieu d'une lecture de Cours par favori
+        favoris = db.session.query(Favoris, Cours).join(
+            Cours, Favoris.cours_id == Cours.id_cours
+        ).filter(
+            Favoris.user_id == current_user.id_user
+        ).all()
        
         favoris_list = []
-        for favori in favoris:
-            cours = Cours.query.get(favori.cours_id)
-            if cours:
-                # Vérification du type de date_ajout pour éviter l'erreur
-                date_format = None
-                if favori.date_ajout:
-                    # Si c'est déjà une chaîne, l'utiliser directement
-                    if isinstance(favori.date_ajout, str):
-                        date_format = favori.date_ajout
-                    # Si c'est un objet datetime, le formater
-                    else:
-                        date_format = favori.date_ajout.strftime("%Y-%m-%d %H:%M:%S")
-                
-                favoris_list.append({
-                    "id_favoris": favori.id_favoris,
-                    "cours_id": cours.id_cours,
-                    "nom": cours.nom,
-                    "domaine": cours.domaine,
-                    "type_ressource": cours.type_ressource,
-                    "niveau": cours.niveau,
-                    "langue": cours.langue,
-                    "date_ajout": date_format
-                })
-        return jsonify(favoris_list), 200
+        for favori, cours in favoris:
+            # Vérification du type de date_ajout pour éviter l'erreur
+            date_format = None
+            if favori.date_ajout:
+                # Si c'est déjà une chaîne, l'utiliser directement
+                if isinstance(favori.date_ajout, str):
+                    date_format = favori.date_ajout
+                # Si c'est un objet datetime, le formater
+                else:
+                    date_format = favori.date_ajout.strftime("%Y-%m-%d %H:%M:%S")
+            
+            favoris_list.append(objet_cours(
+                cours,
+                id_favoris=favori.id_favoris,
+                cours_id=cours.id_cours,
+                date_ajout=date_format
+            ))
+        return reponse_json(favoris_list), 200
     
     except Exception as e:
         # Ajouter une journalisation pour le débogage
@@ -265,9 +275,7 @@ def afficher_historique():
     # Récupérer l'historique avec une jointure sur la table Cours
     historique = db.session.query(
         Historique_Consultation,
-        Cours.nombre_vues,
-        Cours.langue,
-        Cours.type_ressource
+        Cours
     ).join(
         Cours, Historique_Consultation.cours_id == Cours.id_cours
     ).filter(
@@ -277,36 +285,31 @@ def afficher_historique():
     ).all()
 
     historique_list = []
-    for item in historique:
-        # item est maintenant un tuple (Historique_Consultation, nombre_vues, langue, type_ressource)
-        historique_item = item[0]
-        cours = Cours.query.get(historique_item.cours_id)  # Accès via l'ID
-        
-        if cours:
-            historique_list.append({
-                "id_historique": historique_item.id_historique,
-                "cours_id": cours.id_cours,
-                "nom": cours.nom,
-                "domaine": cours.domaine,
-                "type_ressource": cours.type_ressource,
-                "langue": cours.langue,
-                "niveau": cours.niveau,
-                "nombre_vues": cours.nombre_vues,
-                "date_consultation": historique_item.date_consultation.strftime("%Y-%m-%d") if historique_item.date_consultation else None,
-                "heure_consultation": historique_item.date_consultation.strftime("%H:%M:%S") if historique_item.date_consultation else None,
-                "objectifs": cours.objectifs if hasattr(cours, 'objectifs') else None,
-                "durée": cours.durée if hasattr(cours, 'durée') else None
-            })
-
-    return jsonify(historique_list), 200
+    for historique_item, cours in historique:
+        date_consultation = historique_item.date_consultation
+        historique_list.append(objet_cours(
+            cours,
+            id_historique=historique_item.id_historique,
+            cours_id=cours.id_cours,
+            date_consultation=date_consultation.strftime("%Y-%m-%d") if date_consultation else None,
+            heure_consultation=date_consultation.strftime("%H:%M:%S") if date_consultation else None,
+            durée=cours.durée
+        ))
+
+    return reponse_json(historique_list), 200
 
 # Clear user history
 @users_bp.route('/api/profil/historique/clear', methods=['POST'])
 @login_required_route
 def effacer_historique():
     try:
+        retirer_stats_utilisateur(current_user.id_user, historique=True)
         Historique_Consultation.query.filter_by(user_id=current_user.id_user).delete()
+        # Les affinités restantes ne proviennent plus que des favoris et des avis
+        recalculer_affinites(current_user.id_user)
+        incrementer_versions(cle_utilisateur(current_user.id_user))
         db.session.commit()
+        invalider_utilisateur(current_user.id_user)
         return jsonify({"message": "Historique effacé avec succès"}), 200
     except Exception as e:
         db.session.rollback()
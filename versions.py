@@ -0,0 +1,106 @@
+import hashlib
+
+from flask import g, has_app_context, request
+from sqlalchemy import insert, update
+
+from Models import db, Versions
+from compression import SUFFIXES_ETAG
+
+# Compteurs de version stockés en base (partagés par tous les processus), à partir desquels les
+# routes de lecture calculent un ETag sans générer la réponse :
+#   "catalogue"            écritures admin sur les cours (ajout, modification, suppression)
+#   "activite"             compteurs visibles des cours (vues, favoris, avis), tous cours confondus
+#   "cours:<id>"           compteurs et avis d'un cours
+#   "utilisateur:<id>"     interactions et profil d'un utilisateur
+#   "recommandations"      recommandations matérialisées (rafraichir_recommandations.py)
+#   "notes"                avis (matrice des notes de recommendations.py)
+# La table sert aussi à partager entre processus un entier qui n'est pas un compteur :
+#   "affinites_reference"  décalage en jours de la date de référence des affinités (affinites.py)
+
+
+def cle_cours(cours_id):
+    return f"cours:{cours_id}"
+
+
+def cle_utilisateur(user_id):
+    return f"utilisateur:{user_id}"
+
+
+def incrementer_versions(*cles):
+    """Incrémente les versions dans la transaction en cours (commit à la charge de l'appelant)."""
+    for cle in cles:
+        resultat = db.session.execute(
+            update(Versions).where(Versions.cle == cle).values(valeur=Versions.valeur + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if resultat.rowcount == 0:
+            db.session.execute(insert(Versions).values(cle=cle, valeur=1))
+
+
+def fixer_version(cle, valeur):
+    """Donne une valeur précise à une clé, dans la transaction en cours (commit à la charge de l'appelant)."""
+    resultat = db.session.execute(
+        update(Versions).where(Versions.cle == cle).values(valeur=valeur).execution_options(synchronize_session=False)
+    )
+    if resultat.rowcount == 0:
+        db.session.execute(insert(Versions).values(cle=cle, valeur=valeur))
+
+
+def lire_versions(*cles):
+    """Valeur courante de chaque clé, dans l'ordre demandé (0 si elle n'a jamais été incrémentée)."""
+    valeurs = dict(db.session.query(Versions.cle, Versions.valeur).filter(Versions.cle.in_(cles)))
+    return [valeurs.get(cle, 0) for cle in cles]
+
+
+def version_catalogue():
+    """Version « catalogue » lue une fois par requête (mémorisée dans g), pour les caches en mémoire du processus."""
+    if not has_app_context():
+        return lire_versions("catalogue")[0]
+    if "version_catalogue" not in g:
+        g.version_catalogue = lire_versions("catalogue")[0]
+    return g.version_catalogue
+
+
+def version_utilisateur(user_id):
+    """Version « utilisateur:<id> » lue une fois par requête (mémorisée dans g), comme version_catalogue()."""
+    if not has_app_context():
+        return lire_versions(cle_utilisateur(user_id))[0]
+    memo = g.setdefault("versions_utilisateurs", {})
+    if user_id not in memo:
+        memo[user_id] = lire_versions(cle_utilisateur(user_id))[0]
+    return memo[user_id]
+
+
+def etag_requete(*cles, extra=()):
+    """ETag fort de la réponse : versions des données lues, chemin, paramètres de la requête et contexte."""
+    # _t était ajouté par l'ancien client pour contourner le cache : il ne doit pas changer l'ETag
+    parametres = sorted((k, v) for k, v in request.args.items(multi=True) if k != '_t')
+    empreinte = repr((lire_versions(*cles), request.path, parametres, list(extra)))
+    return '"' + hashlib.sha1(empreinte.encode("utf-8")).hexdigest() + '"'
+
+
+def _etag_possede(etag):
+    """Variante de l'ETag (telle quelle ou suffixée par un encodage, voir compression.py) envoyée par le client."""
+    base = etag.strip('"')
+    for variante in [base] + [base + suffixe for suffixe in SUFFIXES_ETAG.values()]:
+        if request.if_none_match.contains_weak(variante):
+            return variante
+    return None
+
+
+def est_inchangee(etag):
+    """Vrai si le client possède déjà cette version (en-tête If-None-Match), compressée ou non."""
+    return _etag_possede(etag) is not None
+
+
+def non_modifiee(etag):
+    # Le 304 reprend l'ETag de la représentation que le client garde en cache
+    possede = _etag_possede(etag)
+    return "", 304, {"ETag": f'"{possede}"' if possede else etag, "Cache-Control": "no-cache"}
+
+
+def avec_etag(reponse, etag):
+    """Ajoute l'ETag à une réponse ; no-cache : le navigateur la garde mais la revalide à chaque usage."""
+    reponse.headers["ETag"] = etag
+    reponse.headers["Cache-Control"] = "no-cache"
+    return reponse
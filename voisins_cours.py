@@ -0,0 +1,88 @@
+"""Calcul hors ligne de la table des cours similaires (top-k voisins de chaque cours).
+
+Exemple : python voisins_cours.py --k 20
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+
+from Models import app, db, Avis, Favoris, Historique_Consultation
+from artefacts import publier
+from recommendations import get_catalogue
+
+# Poids des signaux dans la matrice cours × utilisateurs
+POIDS_SIGNAUX = {"avis": 1.0, "favoris": 1.0, "historique": 0.5}
+
+
+def matrice_interactions(ids_cours):
+    """Matrice cours × utilisateurs des interactions pondérées (avis, favoris, consultations)."""
+    users = {}
+    lignes, colonnes, valeurs = [], [], []
+
+    def ajouter(rows, poids):
+        for user_id, cours_id, *note in rows:
+            lignes.append(cours_id)
+            colonnes.append(users.setdefault(user_id, len(users)))
+            valeurs.append(poids * (note[0] / 5 if note else 1.0))
+
+    ajouter(db.session.query(Avis.user_id, Avis.cours_id, Avis.note), POIDS_SIGNAUX["avis"])
+    ajouter(db.session.query(Favoris.user_id, Favoris.cours_id), POIDS_SIGNAUX["favoris"])
+    ajouter(db.session.query(Historique_Consultation.user_id, Historique_Consultation.cours_id), POIDS_SIGNAUX["historique"])
+
+    # Les interactions sur des cours supprimés sont ignorées
+    cours = np.array(lignes, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(ids_cours, cours), max(len(ids_cours) - 1, 0))
+    connus = (ids_cours[positions] == cours) if len(ids_cours) else np.zeros(len(cours), dtype=bool)
+
+    matrice = sparse.csr_matrix(
+        (np.array(valeurs, dtype=np.float32)[connus], (positions[connus], np.array(colonnes, dtype=np.int64)[connus])),
+        shape=(len(ids_cours), len(users)),
+    )
+    normes = np.sqrt(np.asarray(matrice.multiply(matrice).sum(axis=1)).ravel())
+    return sparse.diags(np.divide(1.0, normes, out=np.zeros_like(normes), where=normes > 0)) @ matrice
+
+
+def calculer_voisins_cours(k=20, poids_collaboratif=0.7, poids_contenu=0.3, taille_bloc=256):
+    """Top-k des cours les plus similaires à chaque cours, par blocs pour borner la mémoire."""
+    catalogue = get_catalogue()
+    ids = catalogue["ids"]
+    n = len(ids)
+    k = min(k, max(n - 1, 0))
+    interactions = matrice_interactions(ids)
+    caracteristiques = catalogue["matrice"]
+
+    voisins = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    for debut in range(0, n, taille_bloc):
+        fin = min(debut + taille_bloc, n)
+        bloc = (
+            poids_collaboratif * (interactions[debut:fin] @ interactions.T).toarray()
+            + poids_contenu * (caracteristiques[debut:fin] @ caracteristiques.T).toarray()
+        )
+        bloc[np.arange(fin - debut), np.arange(debut, fin)] = -np.inf  # un cours n'est pas son propre voisin
+
+        meilleurs = np.argpartition(-bloc, k - 1, axis=1)[:, :k] if 0 < k < n else np.argsort(-bloc, axis=1)[:, :k]
+        valeurs = np.take_along_axis(bloc, meilleurs, axis=1)
+        ordre = np.argsort(-valeurs, axis=1, kind="stable")
+        voisins[debut:fin] = ids[np.take_along_axis(meilleurs, ordre, axis=1)]
+        scores[debut:fin] = np.take_along_axis(valeurs, ordre, axis=1)
+
+    return {"ids": ids, "voisins": voisins, "scores": scores}
+
+
+def enregistrer_voisins_cours(table):
+    return publier("voisins_cours", table)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=20, help="nombre de voisins conservés par cours")
+    args = parser.parse_args()
+
+    with app.app_context():
+        debut = time.perf_counter()
+        table = calculer_voisins_cours(k=args.k)
+        chemin = enregistrer_voisins_cours(table)
+        print(f"📌 {len(table['ids'])} cours traités en {time.perf_counter() - debut:.1f}s → {chemin}")